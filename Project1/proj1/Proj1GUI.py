@@ -105,7 +105,7 @@ class Proj1GUI( QWidget ):
 
 			# Output results from Miller-Rabin and compute the appropriate error bound, if necessary
 			if mr == 'prime':
-				prob = mprobability(k)
+				prob = mprobability(k, n)
 				self.outputMR.setText( '<i>MR Result:</i> {:d} <b>is prime</b> with probability {:5.15f}'.format(n,prob) )
 			else: # Should be 'composite'
 				self.outputMR.setText('<i>MR Result:</i> {:d} is <b>not prime</b>'.format(n))
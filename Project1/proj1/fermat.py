@@ -1,17 +1,89 @@
+import bisect
+import collections
+import itertools
+import math
 import random
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Primes below this are found by sieving, and used to throw out candidates with a small factor
+SIEVE_BOUND = 1000
+
+# Filled in the first time small_primes() and primorial() are called
+small_prime_cache = None
+primorial_cache = None
+
+# How many candidates prefilter() has looked at, and how many it threw out without an exponentiation.
+# Use prefilter_rejection_rate() to tune SIEVE_BOUND with set_sieve_bound()
+prefilter_stats = {'tested': 0, 'rejected': 0}
+
+# Every Carmichael number below 10^7 (all 105 of them), since Fermat can't catch them. Found with
+# is_carmichael: the odd composites below the bound that pass a base 2 Fermat test and meet Korselt's
+# criterion. Bigger ones can still fool Fermat
+CARMICHAEL_NUMBERS = frozenset((
+    561, 1105, 1729, 2465, 2821, 6601, 8911, 10585, 15841, 29341, 41041, 46657, 52633, 62745,
+    63973, 75361, 101101, 115921, 126217, 162401, 172081, 188461, 252601, 278545, 294409,
+    314821, 334153, 340561, 399001, 410041, 449065, 488881, 512461, 530881, 552721, 656601,
+    658801, 670033, 748657, 825265, 838201, 852841, 997633, 1024651, 1033669, 1050985, 1082809,
+    1152271, 1193221, 1461241, 1569457, 1615681, 1773289, 1857241, 1909001, 2100901, 2113921,
+    2433601, 2455921, 2508013, 2531845, 2628073, 2704801, 3057601, 3146221, 3224065, 3581761,
+    3664585, 3828001, 4335241, 4463641, 4767841, 4903921, 4909177, 5031181, 5049001, 5148001,
+    5310721, 5444489, 5481451, 5632705, 5968873, 6049681, 6054985, 6189121, 6313681, 6733693,
+    6840001, 6868261, 7207201, 7519441, 7995169, 8134561, 8341201, 8355841, 8719309, 8719921,
+    8830801, 8927101, 9439201, 9494101, 9582145, 9585541, 9613297, 9890881,
+))
+
+# N -> a base that proved N composite, for the last WITNESS_CACHE_SIZE composites fermat() found.
+# Least recently used entries get evicted first
+WITNESS_CACHE_SIZE = 4096
+witness_cache = collections.OrderedDict()
+
+# How many candidates prime_test_many pulls off the iterable at a time
+BATCH_SIZE = 4096
+
+# How miller_rabin picks its bases when the caller doesn't say:
+#   'random'        - k random bases, like the original assignment
+#   'deterministic' - the fixed witness sets below for N < 2^64, BPSW plus k - 1 random bases above that
+#   'bpsw'          - BPSW plus k - 1 random bases for every N
+MILLER_RABIN_MODE = 'deterministic'
+
+# (bound, bases) pairs: every odd N below bound is prime if and only if it passes Miller-Rabin for all
+# of bases. Sorted by bound so the first match is the smallest set that works
+DETERMINISTIC_WITNESSES = [
+    (2047, [2]),
+    (1373653, [2, 3]),
+    (9080191, [31, 73]),
+    (25326001, [2, 3, 5]),
+    (4759123141, [2, 7, 61]),
+    (1122004669633, [2, 13, 23, 1662803]),
+    (2152302898747, [2, 3, 5, 7, 11]),
+    (3474749660383, [2, 3, 5, 7, 11, 13]),
+    (341550071728321, [2, 3, 5, 7, 11, 13, 17]),
+    (2 ** 64, [2, 325, 9375, 28178, 450775, 9780504, 1795265022]),
+]
+
 
 def prime_test(N, k):
     # This is main function, that is connected to the Test button. You don't need to touch it.
     return fermat(N, k), miller_rabin(N, k)
 
 
-# Time complexity of n^3
+# Time complexity of n^3 (n multiplications of n-bit numbers), but the loop runs in C instead of
+# one Python frame per bit. fermat() and miller_rabin() call this, so they pick it up automatically
 def mod_exp(x, y, N):
+    return pow(x, y, N)
+
+
+# Original recursive version, kept so the benchmark has something to compare against.
+# Time complexity of n^3, space complexity of n^2 because of the n stack frames
+def mod_exp_recursive(x, y, N):
     # When we are finished with recursion
     if y == 0:
         return 1
-    z = mod_exp(x, y//2, N)
+    z = mod_exp_recursive(x, y//2, N)
 
     # Begin returning values from the bottom up until we get our final value
     if y % 2 == 0:
@@ -20,32 +92,221 @@ def mod_exp(x, y, N):
         return x * z ** 2 % N
 
 
+# Time complexity of n^3, space complexity of n since we only keep the running result
+def mod_exp_iterative(x, y, N):
+    result = 1 % N
+    x %= N
+
+    # square-and-multiply, reading the bits of y from least to most significant
+    while y > 0:
+        if y & 1:
+            result = result * x % N
+        x = x * x % N
+        y >>= 1
+    return result
+
+
+# Time complexity of n^3 but with about n/width multiplications instead of n/2
+# Space complexity of 2^(width-1) * n for the table of odd powers
+def mod_exp_window(x, y, N, width=4):
+    if y == 0:
+        return 1 % N
+    x %= N
+
+    # precompute the odd powers x^1, x^3, ..., x^(2^width - 1)
+    x_squared = x * x % N
+    odd_powers = [x]
+    for i in range(1, 1 << (width - 1)):
+        odd_powers.append(odd_powers[i - 1] * x_squared % N)
+
+    # walk the bits of y from the top, consuming up to width bits whenever we hit a 1
+    result = 1
+    i = y.bit_length() - 1
+    while i >= 0:
+        if not (y >> i) & 1:
+            result = result * result % N
+            i -= 1
+            continue
+
+        # find the longest window ending in a 1 bit
+        low = max(i - width + 1, 0)
+        while not (y >> low) & 1:
+            low += 1
+        window = (y >> low) & ((1 << (i - low + 1)) - 1)
+        for _ in range(i - low + 1):
+            result = result * result % N
+        result = result * odd_powers[window >> 1] % N
+        i = low - 1
+    return result
+
+
+# Time complexity of n^3, but every reduction is a shift and mask instead of a division by N.
+# Only works for odd N since R = 2^n has to be coprime to N
+def mod_exp_montgomery(x, y, N):
+    if N % 2 == 0:
+        return mod_exp_iterative(x, y, N)
+    bits = N.bit_length()
+    R = 1 << bits
+    mask = R - 1
+    # N_prime * N = -1 (mod R)
+    N_prime = -pow(N, -1, R) % R
+
+    def reduce(t):
+        m = ((t & mask) * N_prime) & mask
+        u = (t + m * N) >> bits
+        return u - N if u >= N else u
+
+    # move into Montgomery form, run square-and-multiply there, then move back out
+    result = R % N
+    base = (x % N) * R % N
+    while y > 0:
+        if y & 1:
+            result = reduce(result * base)
+        base = reduce(base * base)
+        y >>= 1
+    return reduce(result)
+
+
 # Time complexity of n^2 with integer k which is size n bits
 def fprobability(k):
     return 1 - (1 / 2 ** k)
 
 
-# Time complexity of n^2 with integer k which is size n bits
-def mprobability(k):
+# Time complexity of n^2 with integer k which is size n bits. If N is given and miller_rabin
+# would use a deterministic witness set for it, the answer is exact
+def mprobability(k, N=None):
+    if N is not None and MILLER_RABIN_MODE == 'deterministic' and N < DETERMINISTIC_WITNESSES[-1][0]:
+        return 1.0
     return 1 - (1 / 4 ** k)
 
 
-# Time complexity of kn^3 because we call mod_exp (which is order n^3) k times
+# Time complexity of n log log n, space complexity of n, where n is the bound (not its bit length)
+def sieve(bound):
+    is_prime = bytearray([1]) * bound
+    is_prime[:2] = b'\x00\x00'[:bound]
+    for i in range(2, int(bound ** 0.5) + 1):
+        if is_prime[i]:
+            is_prime[i * i::i] = bytes(len(range(i * i, bound, i)))
+    return [i for i in range(bound) if is_prime[i]]
+
+
+# Builds the sieve once per process and hands back the same list every call after that
+def small_primes():
+    global small_prime_cache
+    if small_prime_cache is None:
+        small_prime_cache = sieve(SIEVE_BOUND)
+    return small_prime_cache
+
+
+# Product of every prime in small_primes(), also built once per process
+def primorial():
+    global primorial_cache
+    if primorial_cache is None:
+        primorial_cache = math.prod(small_primes())
+    return primorial_cache
+
+
+# Changes the sieve bound. The caches get rebuilt the next time they are needed.
+# The bound has to be at least 3 so there is always one small prime to test against
+def set_sieve_bound(bound):
+    global SIEVE_BOUND, small_prime_cache, primorial_cache
+    SIEVE_BOUND = max(bound, 3)
+    small_prime_cache = None
+    primorial_cache = None
+
+
+# Time complexity of n^2 for the gcd against the primorial, no exponentiation at all.
+# Returns 'prime' or 'composite' if the small primes settle N, or None if N still needs testing
+def prefilter(N):
+    prefilter_stats['tested'] += 1
+    if N < 2:
+        prefilter_stats['rejected'] += 1
+        return 'composite'
+
+    # any common factor with the primorial is a small prime dividing N
+    g = math.gcd(N, primorial())
+    if g != 1:
+        primes = small_primes()
+        if N <= primes[-1] and primes[bisect.bisect_left(primes, N)] == N:
+            return 'prime'
+        prefilter_stats['rejected'] += 1
+        return 'composite'
+
+    # no factor below the bound, so anything below the bound squared is prime
+    if N < small_primes()[-1] ** 2:
+        return 'prime'
+    return None
+
+
+# Fraction of the candidates prefilter() has seen that it threw out
+def prefilter_rejection_rate():
+    if prefilter_stats['tested'] == 0:
+        return 0.0
+    return prefilter_stats['rejected'] / prefilter_stats['tested']
+
+
+def reset_prefilter_stats():
+    prefilter_stats['tested'] = 0
+    prefilter_stats['rejected'] = 0
+
+
+# Time complexity of sqrt(n) for the trial division. Korselt's criterion: odd n is a Carmichael number
+# if it is squarefree, has at least 3 prime factors, and p - 1 divides n - 1 for every prime factor p
+def is_carmichael(n):
+    remaining = n
+    factors = 0
+    p = 3
+    while p * p <= remaining:
+        if remaining % p == 0:
+            remaining //= p
+            if remaining % p == 0 or (n - 1) % (p - 1) != 0:
+                return False
+            factors += 1
+        p += 2
+    if remaining > 1:
+        if (n - 1) % (remaining - 1) != 0:
+            return False
+        factors += 1
+    return factors >= 3
+
+
+# Records that base a proved N composite, evicting the least recently used entry if the cache is full
+def remember_witness(N, a):
+    witness_cache[N] = a
+    witness_cache.move_to_end(N)
+    if len(witness_cache) > WITNESS_CACHE_SIZE:
+        witness_cache.popitem(last=False)
+
+
+# Time complexity of kn^3 because we call mod_exp (which is order n^3) k times.
+# Repeat queries for a composite we already have a witness for are O(1)
 def fermat(N, k):
 
-    # if N is an even number return composite
-    if N % 2 == 0:
+    # throw out N if it has a small factor (this covers even numbers too)
+    result = prefilter(N)
+    if result is not None:
+        return result
+
+    # Carmichael numbers pass Fermat for every base coprime to them, so look them up instead
+    if N in CARMICHAEL_NUMBERS:
+        return 'composite'
+
+    # we have already proven this one composite
+    if N in witness_cache:
+        witness_cache.move_to_end(N)
         return 'composite'
 
     # Run through the number of tests
     while k > 0:
 
-        # select a random base and compute modular exponentiation
-        rand_num = random.randint(1, N - 1)
+        # select a random base and compute modular exponentiation. 1 and N - 1 pass for every N,
+        # so they are left out
+        rand_num = random.randint(2, N - 2)
         num = mod_exp(rand_num, N - 1, N)
 
         # If the result of the modular exponentiation is not 1- we know the number is composite
         if num != 1:
+            remember_witness(N, rand_num)
             return 'composite'
         k -= 1
 
@@ -53,55 +314,314 @@ def fermat(N, k):
     return 'prime'
 
 
-# Time complexity of kn^2 because we call mod_exp (which is order n^3) k times. A
-def miller_rabin(N, k):
-
-    # If number is even we know it is composite
-    if N % 2 == 0:
-        return 'composite'
-
-    # Set exponent equal to test value minus one
-    exponent = N - 1
+# Time complexity of n because we shift out one bit at a time
+# Space complexity of n
+def decompose(N):
+    # write N - 1 as 2^s * d with d odd, this only has to happen once per N
+    d = N - 1
+    s = 0
+    while d % 2 == 0:
+        d >>= 1
+        s += 1
+    return s, d
+
+
+# Time complexity of n^3: one mod_exp for a^d and then at most s - 1 squarings, which are n^2 each
+# Returns True if base a proves N is composite
+def is_witness(a, N, s, d):
+    x = mod_exp(a, d, N)
+    if x == 1 or x == N - 1:
+        return False
+
+    # square our way up from a^d to a^(N-1). We need to hit N - 1 before we hit 1
+    for _ in range(s - 1):
+        x = x * x % N
+        if x == N - 1:
+            return False
+        if x == 1:
+            return True
+    return True
+
+
+# Returns the smallest known set of bases that makes Miller-Rabin exact for N, or None if N is too big
+def deterministic_witnesses(N):
+    for bound, bases in DETERMINISTIC_WITNESSES:
+        if N < bound:
+            return bases
+    return None
+
+
+# Time complexity of n^2, same idea as the gcd. Computes the Jacobi symbol (a/n) for odd n
+def jacobi(a, n):
+    a %= n
+    result = 1
+    while a != 0:
+        # pull out factors of two, (2/n) is -1 when n is 3 or 5 mod 8
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        # quadratic reciprocity
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+# Time complexity of n^3, one step per bit of k like mod_exp.
+# Returns U_k, V_k and Q^k (mod N) for the Lucas sequences with parameters P, Q and D = P^2 - 4Q
+def lucas_sequence(P, Q, D, k, N):
+    U, V, Qk = 1, P % N, Q % N
+    for bit in bin(k)[3:]:
+        # double the index
+        U = U * V % N
+        V = (V * V - 2 * Qk) % N
+        Qk = Qk * Qk % N
+        if bit == '1':
+            # add one to the index. Both need dividing by 2, which is fine since N is odd
+            U, V = P * U + V, D * U + P * V
+            if U % 2:
+                U += N
+            if V % 2:
+                V += N
+            U = (U // 2) % N
+            V = (V // 2) % N
+            Qk = Qk * Q % N
+    return U, V, Qk
+
+
+# Time complexity of n^3. Strong Lucas probable prime test with Selfridge's parameters
+# (D is the first of 5, -7, 9, -11, ... with Jacobi symbol -1, P = 1, Q = (1 - D) / 4)
+def strong_lucas(N):
+    # perfect squares never give a Jacobi symbol of -1, so catch them before searching for D
+    root = math.isqrt(N)
+    if root * root == N:
+        return False
+
+    D = 5
+    while True:
+        j = jacobi(D, N)
+        if j == -1:
+            break
+        if j == 0 and abs(D) != N:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4
+
+    # write N + 1 as 2^s * d with d odd
+    d = N + 1
+    s = 0
+    while d % 2 == 0:
+        d >>= 1
+        s += 1
+
+    U, V, Qk = lucas_sequence(1, Q, D, d, N)
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % N
+        Qk = Qk * Qk % N
+        if V == 0:
+            return True
+    return False
+
+
+# Time complexity of n^3. Baillie-PSW: a strong test to base 2 and a strong Lucas test.
+# No composite is known to pass both
+def bpsw(N, s, d):
+    return not is_witness(2, N, s, d) and strong_lucas(N)
+
+
+# Time complexity of kn^3 because we call is_witness (which is order n^3) k times.
+# In deterministic mode N < 2^64 needs at most 7 bases no matter what k is
+def miller_rabin(N, k, mode=None):
+    if mode is None:
+        mode = MILLER_RABIN_MODE
+
+    # throw out N if it has a small factor, this also handles the numbers too small to pick a base from
+    result = prefilter(N)
+    if result is not None:
+        return result
+
+    s, d = decompose(N)
+    if mode == 'deterministic':
+        bases = deterministic_witnesses(N)
+        if bases is not None:
+            for a in bases:
+                # big bases have to be reduced, and a multiple of N tells us nothing
+                a %= N
+                if a != 0 and is_witness(a, N, s, d):
+                    return 'composite'
+            return 'prime'
+
+    if mode in ('deterministic', 'bpsw'):
+        # BPSW replaces one random round
+        if not bpsw(N, s, d):
+            return 'composite'
+        k -= 1
 
     while k > 0:
 
-        # Select random base, compute modular exponentiation to see if it passes the first test
-        rand_num = random.randint(1, N - 1)
-        num = mod_exp(rand_num, exponent, N)
-        if num == 1:
-
-            # if N passes the first test call helper function to run miller rabin test until it returns
-            encounter = False
-            is_prime = miller_rabin_helper(rand_num, N - 1, N, encounter)
-            if not is_prime:
-                return 'composite'
-        else:
+        # Select random base and see if it proves N composite
+        rand_num = random.randint(2, N - 2)
+        if is_witness(rand_num, N, s, d):
             return 'composite'
         k -= 1
 
     return 'prime'
 
 
-# n^3 apply max rule would be n^3 + (n-1)/2
-def miller_rabin_helper(rand_num, exponent, test_num, encounter):
-
-    # If the exponent is odd we want to move on to test the next base
-    if exponent % 2 != 0:
-        return True
-
-    result = mod_exp(rand_num, exponent, test_num)
-
-    if result == test_num - 1:
-        encounter = True
-
-    # if the result of mod_exp is not one and it is also not test_num - 1 return false if we have not seen a result
-    # be test_num - 1
-    if result != 1 and result != test_num - 1:
-        if not encounter:
-            return False
+# Runs both tests off one exponentiation, since a^(N-1) is the end of the Miller-Rabin squaring chain.
+# Time complexity of n^3. Returns (passes fermat, passes miller-rabin) for base a
+def test_base(a, N, s, d):
+    x = mod_exp(a, d, N)
+    mr_pass = x == 1
+    for _ in range(s):
+        # once we hit 1 every later square is 1 too
+        if x == 1:
+            break
+        if x == N - 1:
+            mr_pass = True
+        x = x * x % N
+    return x == 1, mr_pass
+
+
+# Time complexity of kn^3, same as prime_test but the sieve, the decomposition and the bases are
+# shared between both tests. bases is a list of random numbers that get reduced into [2, N-2].
+# In deterministic mode Miller-Rabin uses the same witness sets as miller_rabin for N < 2^64 instead
+# of the random bases, so its answer there is exact
+def prime_test_shared(N, bases):
+    # check against the cached small primes before doing any exponentiation
+    result = prefilter(N)
+    if result is not None:
+        return result, result
+
+    s, d = decompose(N)
+    witnesses = deterministic_witnesses(N) if MILLER_RABIN_MODE == 'deterministic' else None
+    fermat_result = 'prime'
+    mr_result = 'prime'
+    for base in bases:
+        f_pass, mr_pass = test_base(2 + base % (N - 3), N, s, d)
+        if not mr_pass:
+            mr_result = 'composite'
+        # failing fermat means failing miller-rabin too, so there is nothing left to learn
+        if not f_pass:
+            fermat_result = 'composite'
+            break
+    if witnesses is not None and fermat_result == 'prime':
+        # big bases have to be reduced, and a multiple of N tells us nothing
+        mr_result = 'composite' if any(a % N != 0 and is_witness(a % N, N, s, d) for a in witnesses) else 'prime'
+    return fermat_result, mr_result
+
+
+# Vectorized version of mod_exp over arrays. Every value of N has to be below 2^32 so that
+# the product of two residues still fits in a uint64
+def mod_exp_array(x, y, N):
+    result = np.ones_like(N)
+    x = x % N
+    y = y.copy()
+    while y.any():
+        odd = (y & 1).astype(bool)
+        result = np.where(odd, result * x % N, result)
+        x = x * x % N
+        y >>= 1
+    return result
+
+
+# Vectorized test_base over arrays of bases and numbers, with N - 1 = 2^s * d for each. Returns the
+# (passes fermat, passes miller-rabin) masks
+def test_base_array(a, N, s, d):
+    x = mod_exp_array(a, d, N)
+    mr_pass = x == 1
+    for i in range(int(s.max())):
+        in_chain = i < s
+        mr_pass |= in_chain & (x == N - np.uint64(1))
+        x = np.where(in_chain, x * x % N, x)
+    return x == 1, mr_pass
+
+
+# Vectorized prime_test_shared for a chunk of numbers that fit in an int64. Trial division runs over
+# the whole array, and numbers below 2^32 get the exponentiations vectorized as well. Anything
+# bigger that survives trial division goes through prime_test_shared one at a time
+def prime_test_array(values, bases):
+    values = np.asarray(values, dtype=np.int64)
+    primes = small_primes()
+    is_prime = np.zeros(len(values), dtype=bool)
+    fermat_prime = np.zeros(len(values), dtype=bool)
+
+    # mark everything trial division can settle
+    is_prime[(values == 2) | (values == 3)] = True
+    decided = values < 4
+    for p in primes:
+        divisible = values % p == 0
+        is_prime[divisible & (values == p)] = True
+        decided |= divisible
+    prefilter_stats['tested'] += len(values)
+    prefilter_stats['rejected'] += int((decided & ~is_prime).sum())
+    below_square = ~decided & (values < primes[-1] ** 2)
+    is_prime[below_square] = True
+    decided |= below_square
+    fermat_prime[:] = is_prime
+
+    # vectorized exponentiation for what is left below 2^32
+    small = np.flatnonzero(~decided & (values < 2 ** 32))
+    if len(small):
+        N = values[small].astype(np.uint64)
+        d = N - np.uint64(1)
+        s = np.zeros(len(N), dtype=np.int64)
+        even = (d & np.uint64(1)) == 0
+        while even.any():
+            d[even] >>= np.uint64(1)
+            s[even] += 1
+            even = (d & np.uint64(1)) == 0
+
+        # a witness set that is exact for the biggest number is exact for all of them
+        witnesses = deterministic_witnesses(int(N.max())) if MILLER_RABIN_MODE == 'deterministic' else None
+        mr_all = np.ones(len(N), dtype=bool)
+        fermat_all = np.ones(len(N), dtype=bool)
+        for base in bases:
+            a = np.uint64(2) + np.uint64(base % 2 ** 62) % (N - np.uint64(3))
+            f_pass, mr_pass = test_base_array(a, N, s, d)
+            mr_all &= mr_pass
+            fermat_all &= f_pass
+        if witnesses is not None:
+            # fermat failing already proves N composite, so only the rest need the witnesses
+            mr_all = fermat_all.copy()
+            rest = np.flatnonzero(fermat_all)
+            if len(rest):
+                # every witness at once, one row each. A multiple of N tells us nothing, and base 1
+                # passes every N
+                a = np.array(witnesses, dtype=np.uint64)[:, None] % N[rest]
+                mr_pass = test_base_array(np.where(a == 0, np.uint64(1), a), N[rest], s[rest], d[rest])[1]
+                mr_all[rest] = mr_pass.all(axis=0)
+        is_prime[small] = mr_all
+        fermat_prime[small] = fermat_all
+        decided[small] = True
+
+    results = [('prime' if f else 'composite', 'prime' if m else 'composite')
+               for f, m in zip(fermat_prime.tolist(), is_prime.tolist())]
+    for i in np.flatnonzero(~decided).tolist():
+        results[i] = prime_test_shared(int(values[i]), bases)
+    return results
+
+
+# Batch version of prime_test. Takes any iterable (or NumPy array) of numbers and yields a
+# (fermat, miller_rabin) tuple for each, in order, without holding the whole input in memory.
+# Miller-Rabin gives the same exact answer as prime_test in deterministic mode for N < 2^64. Fermat,
+# and Miller-Rabin everywhere else, use k random bases drawn once for the whole batch (with no BPSW
+# round), and fermat()'s witness cache is neither read nor filled
+def prime_test_many(numbers, k):
+    bases = [random.randrange(2, 2 ** 62) for _ in range(k)]
+    numbers = iter(numbers)
+    while True:
+        chunk = list(itertools.islice(numbers, BATCH_SIZE))
+        if not chunk:
+            return
+
+        # the vectorized path needs every number to fit in an int64
+        if np is not None and all(0 <= int(N) < 2 ** 63 for N in chunk):
+            yield from prime_test_array(chunk, bases)
         else:
-            return True
-
-    else:
-        return miller_rabin_helper(rand_num, exponent/2, test_num, encounter)
-
+            for N in chunk:
+                yield prime_test_shared(int(N), bases)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from fermat import *
+# the star import copies SIEVE_BOUND once, so the current bound has to be read off the module
+import fermat as fermat_module
+from prime_search import PrimeSearcher
+
+# The recursive version needs one stack frame per bit of the exponent
+sys.setrecursionlimit(20000)
+
+BIT_SIZES = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+
+# Returns the average time per call in seconds
+def time_call(func, args, repeats):
+    t1 = time.perf_counter()
+    for _ in range(repeats):
+        func(*args)
+    t2 = time.perf_counter()
+    return (t2 - t1) / repeats
+
+
+# Times every mod_exp engine against the original recursive version, for a random odd modulus
+# and a full size exponent, which is what fermat() and miller_rabin() do
+def bench_mod_exp(bit_sizes=BIT_SIZES, seed=312):
+    rng = random.Random(seed)
+    engines = [
+        ('recursive', mod_exp_recursive),
+        ('iterative', mod_exp_iterative),
+        ('window', mod_exp_window),
+        ('montgomery', mod_exp_montgomery),
+        ('pow', mod_exp),
+    ]
+
+    print('mod_exp, seconds per call (speedup over recursive)')
+    print('{:>6}'.format('bits') + ''.join('{:>22}'.format(name) for name, _ in engines))
+    for bits in bit_sizes:
+        N = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        x = rng.randrange(2, N - 1)
+        args = (x, N - 1, N)
+
+        # keep each row to roughly the same wall time
+        repeats = max(1, 2 ** 14 // bits)
+        expected = mod_exp(*args)
+        row = '{:>6}'.format(bits)
+        base_time = None
+        for name, func in engines:
+            assert func(*args) == expected, name
+            elapsed = time_call(func, args, repeats)
+            if base_time is None:
+                base_time = elapsed
+            row += '{:>14.6f} ({:>5.1f}x)'.format(elapsed, base_time / elapsed)
+        print(row)
+
+
+# Copy of the miller_rabin we had before decompose() and is_witness(), kept so the benchmark has a
+# baseline. It does a full exponentiation for every halving of the exponent
+def miller_rabin_legacy(N, k, rng=random):
+    if N % 2 == 0:
+        return 'composite'
+    while k > 0:
+        rand_num = rng.randint(2, N - 2)
+        if mod_exp_recursive(rand_num, N - 1, N) != 1:
+            return 'composite'
+        exponent = N - 1
+        while exponent % 2 == 0:
+            result = mod_exp_recursive(rand_num, exponent // 2, N)
+            if result == N - 1:
+                break
+            if result != 1:
+                return 'composite'
+            exponent //= 2
+        k -= 1
+    return 'prime'
+
+
+# Finds a random prime of the given size using the current miller_rabin, which runs prefilter()
+# first so most candidates never get exponentiated
+def random_test_prime(bits, rng):
+    while True:
+        N = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if miller_rabin(N, 20) == 'prime':
+            return N
+
+
+# Compares the old and new Miller-Rabin on primes, which is the worst case since every base runs
+def bench_miller_rabin(bit_sizes=(1024, 2048, 4096), k=5, seed=312):
+    rng = random.Random(seed)
+    print('miller_rabin on {}-round primes, seconds per call'.format(k))
+    print('{:>6}{:>14}{:>14}{:>10}'.format('bits', 'legacy', 'current', 'speedup'))
+    for bits in bit_sizes:
+        N = random_test_prime(bits, rng)
+        repeats = max(1, 2 ** 12 // bits)
+        legacy_time = time_call(miller_rabin_legacy, (N, k), repeats)
+        current_time = time_call(miller_rabin, (N, k), repeats)
+        print('{:>6}{:>14.6f}{:>14.6f}{:>9.1f}x'.format(bits, legacy_time, current_time, legacy_time / current_time))
+
+
+# Compares calling prime_test once per number against prime_test_many on the same numbers
+def bench_batch(cases=((31, 20000), (62, 20000), (512, 500)), k=10, seed=312):
+    rng = random.Random(seed)
+    print('prime_test vs prime_test_many, numbers per second')
+    print('{:>6}{:>8}{:>14}{:>14}{:>10}'.format('bits', 'count', 'per call', 'batch', 'speedup'))
+    for bits, count in cases:
+        numbers = [rng.getrandbits(bits) | (1 << (bits - 1)) | 1 for _ in range(count)]
+
+        t1 = time.perf_counter()
+        for N in numbers:
+            prime_test(N, k)
+        t2 = time.perf_counter()
+        for _ in prime_test_many(numbers, k):
+            pass
+        t3 = time.perf_counter()
+
+        per_call = count / (t2 - t1)
+        batch = count / (t3 - t2)
+        print('{:>6}{:>8}{:>14.0f}{:>14.0f}{:>9.1f}x'.format(bits, count, per_call, batch, batch / per_call))
+
+
+# Shows how the sieve bound trades prefilter cost against exponentiations saved, on random odd numbers
+def bench_prefilter(bounds=(100, 1000, 10000, 100000), bits=1024, count=500, k=10, seed=312):
+    rng = random.Random(seed)
+    numbers = [rng.getrandbits(bits) | (1 << (bits - 1)) | 1 for _ in range(count)]
+    print('prefilter on {} random odd {}-bit numbers'.format(count, bits))
+    print('{:>8}{:>12}{:>16}'.format('bound', 'rejected', 'sec per number'))
+    original_bound = fermat_module.SIEVE_BOUND
+    for bound in bounds:
+        set_sieve_bound(bound)
+        primorial()
+        reset_prefilter_stats()
+        t1 = time.perf_counter()
+        for N in numbers:
+            miller_rabin(N, k)
+        t2 = time.perf_counter()
+        print('{:>8}{:>11.1f}%{:>16.6f}'.format(bound, 100 * prefilter_rejection_rate(), (t2 - t1) / count))
+    set_sieve_bound(original_bound)
+
+
+# Times random_prime at each pool size so we can see how the search scales with cores.
+# The pool is started before the clock so only the search itself is measured
+def bench_prime_search(bits=2048, searches=5, seed=312):
+    print('random_prime({}), seconds per prime'.format(bits))
+    print('{:>8}{:>14}{:>10}'.format('workers', 'seconds', 'speedup'))
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+        worker_counts.append(worker_counts[-1] * 2)
+    base_time = None
+    for workers in worker_counts:
+        rng = random.Random(seed)
+        with PrimeSearcher(workers) as searcher:
+            t1 = time.perf_counter()
+            for _ in range(searches):
+                searcher.random_prime(bits, rng=rng)
+            t2 = time.perf_counter()
+        elapsed = (t2 - t1) / searches
+        if base_time is None:
+            base_time = elapsed
+        print('{:>8}{:>14.3f}{:>9.1f}x'.format(workers, elapsed, base_time / elapsed))
+
+
+# Least squares slope of log(y) against log(x), so y grows like x^slope
+def fit_exponent(xs, ys):
+    log_x = [math.log(x) for x in xs]
+    log_y = [math.log(y) for y in ys]
+    mean_x = sum(log_x) / len(log_x)
+    mean_y = sum(log_y) / len(log_y)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(log_x, log_y))
+    variance = sum((x - mean_x) ** 2 for x in log_x)
+    return covariance / variance
+
+
+# Times mod_exp, fermat and miller_rabin on primes (so every round runs) across bit lengths and k,
+# then fits how the time grows with the bit length. The comments in fermat.py claim n^3 and kn^3
+def bench_scaling(bit_sizes=(128, 256, 512, 1024, 2048), k_values=(1, 5, 20), seed=312):
+    rng = random.Random(seed)
+    primes = {bits: random_test_prime(bits, rng) for bits in bit_sizes}
+    rows = []
+    for bits in bit_sizes:
+        N = primes[bits]
+        repeats = max(1, 2 ** 13 // bits)
+        rows.append({'function': 'mod_exp', 'bits': bits, 'k': None,
+                     'seconds': time_call(mod_exp, (rng.randrange(2, N - 1), N - 1, N), repeats)})
+        for k in k_values:
+            rows.append({'function': 'fermat', 'bits': bits, 'k': k,
+                         'seconds': time_call(fermat, (N, k), repeats)})
+            rows.append({'function': 'miller_rabin', 'bits': bits, 'k': k,
+                         'seconds': time_call(miller_rabin, (N, k, 'random'), repeats)})
+
+    fits = []
+    for function in ('mod_exp', 'fermat', 'miller_rabin'):
+        for k in ([None] if function == 'mod_exp' else k_values):
+            series = [row for row in rows if row['function'] == function and row['k'] == k]
+            exponent = fit_exponent([row['bits'] for row in series], [row['seconds'] for row in series])
+            fits.append({'function': function, 'k': k, 'exponent': exponent})
+
+    print('growth in bit length, time ~ n^exponent')
+    print('{:>14}{:>6}{:>10}'.format('function', 'k', 'exponent'))
+    for fit in fits:
+        print('{:>14}{:>6}{:>10.2f}'.format(fit['function'], fit['k'] or '-', fit['exponent']))
+    return {'timings': rows, 'fits': fits}
+
+
+# Odd composites below bound that pass Fermat to base 2, and the ones among them that also pass the
+# strong (Miller-Rabin) test to base 2. These are the inputs most likely to fool the testers
+def base2_pseudoprimes(bound):
+    primes = set(sieve(bound))
+    fermat_list = [n for n in range(3, bound, 2) if n not in primes and pow(2, n - 1, n) == 1]
+    strong_list = []
+    for n in fermat_list:
+        s, d = decompose(n)
+        if not is_witness(2, n, s, d):
+            strong_list.append(n)
+    return fermat_list, strong_list
+
+
+# Runs fermat and random-base miller_rabin many times on known pseudoprimes and on primes, and compares
+# the false positive rate to the 1/2^k and 1/4^k bounds. The prefilter is turned down to its minimum
+# so the tests themselves get exercised. Primes must never come back composite
+def validate(bound=10 ** 6, k_values=(1, 2, 3), trials=20, seed=312):
+    random.seed(seed)
+    fermat_list, strong_list = base2_pseudoprimes(bound)
+    carmichael_list = [n for n in fermat_list if is_carmichael(n)]
+    prime_list = sieve(bound)[-1000:]
+    cases = [('fermat base 2 pseudoprimes', fermat_list), ('strong base 2 pseudoprimes', strong_list),
+             ('carmichael numbers', carmichael_list)]
+
+    original_bound = fermat_module.SIEVE_BOUND
+    set_sieve_bound(3)
+    witness_cache.clear()
+    rows = []
+    try:
+        for k in k_values:
+            for name, numbers in cases:
+                tested = len(numbers) * trials
+                fermat_wrong = 0
+                mr_wrong = 0
+                for _ in range(trials):
+                    witness_cache.clear()
+                    fermat_wrong += sum(fermat(n, k) == 'prime' for n in numbers)
+                    mr_wrong += sum(miller_rabin(n, k, 'random') == 'prime' for n in numbers)
+                rows.append({'input': name, 'k': k, 'count': len(numbers),
+                             'fermat_false_positive_rate': fermat_wrong / tested, 'fermat_bound': 1 / 2 ** k,
+                             'miller_rabin_false_positive_rate': mr_wrong / tested, 'miller_rabin_bound': 1 / 4 ** k})
+            false_negatives = sum(prime_test(p, k) != ('prime', 'prime') for p in prime_list)
+            rows.append({'input': 'primes', 'k': k, 'count': len(prime_list), 'false_negatives': false_negatives})
+    finally:
+        set_sieve_bound(original_bound)
+
+    print('false positive rates below {} ({} trials each)'.format(bound, trials))
+    print('{:>28}{:>4}{:>7}{:>10}{:>10}{:>10}{:>10}'.format('input', 'k', 'count', 'fermat', 'bound', 'mr', 'bound'))
+    for row in rows:
+        if row['input'] == 'primes':
+            print('{:>28}{:>4}{:>7}   false negatives: {}'.format('primes', row['k'], row['count'],
+                                                                   row['false_negatives']))
+        else:
+            print('{:>28}{:>4}{:>7}{:>10.4f}{:>10.4f}{:>10.4f}{:>10.4f}'.format(
+                row['input'], row['k'], row['count'], row['fermat_false_positive_rate'], row['fermat_bound'],
+                row['miller_rabin_false_positive_rate'], row['miller_rabin_bound']))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks and statistical checks for fermat.py.')
+    parser.add_argument('--json', metavar='PATH', help='write the scaling and validation results here')
+    parser.add_argument('--all', action='store_true', help='also run the speedup comparisons')
+    args = parser.parse_args(argv)
+
+    if args.all:
+        bench_mod_exp()
+        bench_miller_rabin()
+        bench_batch()
+        bench_prefilter()
+        bench_prime_search()
+    results = {
+        'python': sys.version.split()[0],
+        'scaling': bench_scaling(),
+        'validation': validate(),
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
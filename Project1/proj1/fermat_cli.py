@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import sys
+import time
+
+# Only the primality code, so none of this needs PyQt or a display
+from fermat import *
+
+
+# Runs both tests on N and returns everything the GUI would show, plus how long it took
+def test_one(N, k):
+    t1 = time.perf_counter()
+    fermat_result, mr_result = prime_test(N, k)
+    t2 = time.perf_counter()
+
+    result = {'N': N, 'k': k, 'fermat': fermat_result, 'miller_rabin': mr_result, 'seconds': t2 - t1}
+    # error bounds only make sense when the test said prime, same as the GUI
+    result['fermat_probability'] = fprobability(k) if fermat_result == 'prime' else None
+    result['miller_rabin_probability'] = mprobability(k, N) if mr_result == 'prime' else None
+    return result
+
+
+# A request line is either a bare integer, or a JSON object like {"N": 312, "k": 10}.
+# Returns (N, k), raising ValueError if the line doesn't hold integers
+def parse_request(line, default_k):
+    line = line.strip()
+    if line.startswith('{'):
+        request = json.loads(line)
+        N = request.get('N')
+        k = request.get('k', default_k)
+    else:
+        N = int(line)
+        k = default_k
+    if type(N) != int or type(k) != int:
+        raise ValueError('inputs must be integers!')
+    if k < 1:
+        raise ValueError('k must be at least 1')
+    return N, k
+
+
+# Handles one request line. Never raises, bad input turns into an error response instead
+def handle_line(line, default_k):
+    try:
+        N, k = parse_request(line, default_k)
+    except ValueError as e:
+        return {'input': line.strip(), 'error': str(e)}
+    return test_one(N, k)
+
+
+# Reads one request per line from infile and writes one JSON verdict per line to outfile
+def run_jsonl(infile, outfile, default_k):
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(json.dumps(handle_line(line, default_k)) + '\n')
+        outfile.flush()
+
+
+# Serves JSON-lines over TCP. Requests from every connection share one process pool, so a slow
+# number on one connection doesn't hold up the others. Responses on a connection come back in the
+# same order as its requests
+async def serve(host, port, default_k, workers=None):
+    loop = asyncio.get_running_loop()
+    # forked workers would inherit open client sockets and keep them from closing, so spawn them
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+
+    async def handle_connection(reader, writer):
+        responses = asyncio.Queue()
+
+        async def write_responses():
+            while True:
+                future = await responses.get()
+                if future is None:
+                    break
+                writer.write((json.dumps(await future) + '\n').encode())
+                await writer.drain()
+
+        writer_task = asyncio.create_task(write_responses())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode()
+                if not line.strip():
+                    continue
+                responses.put_nowait(loop.run_in_executor(pool, handle_line, line, default_k))
+        finally:
+            responses.put_nowait(None)
+            await writer_task
+            writer.close()
+
+    server = await asyncio.start_server(handle_connection, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless Fermat and Miller-Rabin primality tester.')
+    parser.add_argument('numbers', nargs='*', type=int, help='numbers to test (reads JSON lines from stdin if none)')
+    parser.add_argument('-k', type=int, default=10, help='number of random trials (default 10)')
+    parser.add_argument('--serve', metavar='HOST:PORT', help='run a JSON-lines server instead')
+    parser.add_argument('--workers', type=int, default=None, help='server process pool size')
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        host, _, port = args.serve.rpartition(':')
+        asyncio.run(serve(host or '127.0.0.1', int(port), args.k, args.workers))
+    elif args.numbers:
+        for N in args.numbers:
+            print(json.dumps(test_one(N, args.k)))
+    else:
+        run_jsonl(sys.stdin, sys.stdout, args.k)
+
+
+if __name__ == '__main__':
+    main()
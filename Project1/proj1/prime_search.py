@@ -0,0 +1,161 @@
+import concurrent.futures
+import multiprocessing
+import os
+import random
+
+from fermat import *
+
+# Every window gets sieved by the primes below this before any candidate is tested
+WINDOW_SIEVE_BOUND = 2 ** 16
+
+# Filled in the first time window_primes() is called (once per worker process)
+window_prime_cache = None
+
+# Shared with the worker processes through init_worker(). Windows with an index above this
+# stop testing candidates, so the search can cancel work that is already running
+stop_index = None
+
+# Larger than any window index we will ever hand out
+NO_STOP = 2 ** 62
+
+
+def window_primes():
+    global window_prime_cache
+    if window_prime_cache is None:
+        window_prime_cache = sieve(WINDOW_SIEVE_BOUND)
+    return window_prime_cache
+
+
+def init_worker(shared_stop_index):
+    global stop_index
+    stop_index = shared_stop_index
+
+
+# Time complexity of length * log log(WINDOW_SIEVE_BOUND), space complexity of length.
+# Returns the numbers in [start, start + length) that have no factor below WINDOW_SIEVE_BOUND
+def sieve_window(start, length):
+    candidates = bytearray([1]) * length
+    for p in window_primes():
+        # first multiple of p inside the window, starting at p^2 so p itself never gets struck
+        lowest = max(p * p, start)
+        first = lowest + (-lowest) % p - start
+        if first < length:
+            candidates[first::p] = bytes(len(range(first, length, p)))
+    if start < 2:
+        candidates[:2 - start] = bytes(2 - start)
+    return [start + i for i in range(length) if candidates[i]]
+
+
+# Runs inside a worker. Returns the first prime in the window, or None if there isn't one
+# (or the search no longer needs this window)
+def search_window(index, start, length, k):
+    for N in sieve_window(start, length):
+        if stop_index is not None and index > stop_index.value:
+            return None
+        if miller_rabin(N, k) == 'prime':
+            return N
+    return None
+
+
+# Hands out windows of candidates to a pool of worker processes. Keep one around to avoid paying
+# the process start up cost on every search
+class PrimeSearcher:
+
+    def __init__(self, workers=None, k=20):
+        self.workers = workers or os.cpu_count() or 1
+        self.k = k
+        self.stop_index = multiprocessing.Value('q', NO_STOP, lock=False)
+        self.pool = None
+        if self.workers > 1:
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_worker, initargs=(self.stop_index,))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Smallest prime >= start
+    def next_prime(self, start, window=None):
+        return self.search(start, window, ordered=True)
+
+    # A random prime with exactly the given number of bits. The start point comes from the operating
+    # system's RNG, since these can be key material and Mersenne Twister output can be predicted.
+    # Pass a random.Random(seed) as rng to get the same primes every run, for benchmarks
+    def random_prime(self, bits, window=None, rng=None):
+        if bits < 2:
+            raise ValueError('bits must be at least 2')
+        if rng is None:
+            rng = random.SystemRandom()
+        while True:
+            start = rng.getrandbits(bits) | (1 << (bits - 1))
+            N = self.search(start, window, ordered=False)
+            if N.bit_length() == bits:
+                return N
+
+    # When ordered is True we have to wait for every lower window before trusting a result,
+    # otherwise the first prime any worker finds wins
+    def search(self, start, window=None, ordered=True):
+        if window is None:
+            window = max(256, start.bit_length())
+
+        # no pool, just walk the windows in this process
+        if self.pool is None:
+            index = 0
+            while True:
+                N = search_window(index, start + index * window, window, self.k)
+                if N is not None:
+                    return N
+                index += 1
+
+        self.stop_index.value = NO_STOP
+        pending = {}
+        results = {}
+        next_index = 0
+        found = None
+        try:
+            while True:
+                # keep every worker busy with a couple of windows queued up behind it
+                while found is None and len(pending) < 2 * self.workers:
+                    future = self.pool.submit(search_window, next_index, start + next_index * window,
+                                              window, self.k)
+                    pending[future] = next_index
+                    next_index += 1
+
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    results[index] = future.result()
+                    if results[index] is not None and (found is None or index < found):
+                        found = index
+                        # windows above this one can stop, and unordered searches need nothing else
+                        self.stop_index.value = index if ordered else -1
+
+                if found is not None:
+                    # an ordered search still needs every window below the one we found
+                    if not ordered or all(i in results for i in range(found)):
+                        return results[found]
+        finally:
+            # make sure nothing from this search is still running before the next one resets stop_index
+            self.stop_index.value = -1
+            for future in pending:
+                future.cancel()
+            concurrent.futures.wait(pending)
+
+
+# Smallest prime >= start, using a temporary pool
+def next_prime(start, k=20, workers=None):
+    with PrimeSearcher(workers, k) as searcher:
+        return searcher.next_prime(start)
+
+
+# Random prime with exactly bits bits, using a temporary pool
+def random_prime(bits, k=20, workers=None, rng=None):
+    with PrimeSearcher(workers, k) as searcher:
+        return searcher.random_prime(bits, rng=rng)
@@ -0,0 +1,101 @@
+import concurrent.futures
+import math
+import random
+
+import numpy as np
+
+from fermat import miller_rabin
+
+# Odd numbers per segment. Each segment is one byte per odd number, so this is also the
+# memory budget for a segment in bytes (16 MB, covering 2^25 integers)
+SEGMENT_SIZE = 2 ** 24
+
+
+# Time complexity of n log log n, space complexity of n. Plain sieve for the base primes
+def base_primes(bound):
+    is_prime = np.ones(bound + 1, dtype=bool)
+    is_prime[:2] = False
+    for i in range(2, math.isqrt(bound) + 1):
+        if is_prime[i]:
+            is_prime[i * i::i] = False
+    return np.flatnonzero(is_prime)
+
+
+# Sieves the odd numbers in [lo, hi) with the odd base primes and returns the primes in the
+# segment as an int64 array. Slot i of the segment stands for the odd number lo + 2i, so lo must be odd
+def sieve_segment(lo, hi, primes):
+    size = (hi - lo + 1) // 2
+    segment = np.ones(size, dtype=bool)
+    for p in primes.tolist():
+        # first odd multiple of p in the segment, but never below p^2 so p itself survives
+        start = max(p * p, (lo + p - 1) // p * p)
+        if start % 2 == 0:
+            start += p
+        if start >= hi:
+            continue
+        segment[(start - lo) // 2::p] = False
+    if lo == 1:
+        segment[0] = False
+    return np.flatnonzero(segment).astype(np.int64) * 2 + lo
+
+
+# Splits [lo, hi) into segment bounds. Every segment starts on an odd number
+def segment_bounds(lo, hi, segment_size):
+    start = lo | 1
+    while start < hi:
+        end = min(start + 2 * segment_size, hi)
+        yield start, end
+        start = end
+
+
+# Yields the primes in [lo, hi) one NumPy array per segment, in increasing order. Memory stays at
+# about SEGMENT_SIZE bytes per segment in flight plus the base primes up to sqrt(hi).
+# With workers > 1 the segments are sieved in a process pool, at most two per worker at a time
+def prime_segments(lo, hi, workers=1, segment_size=SEGMENT_SIZE):
+    if hi <= 2 or hi <= lo:
+        return
+    if lo <= 2:
+        yield np.array([2], dtype=np.int64)
+        lo = 3
+    primes = base_primes(math.isqrt(hi - 1))
+    primes = primes[1:]
+
+    bounds = segment_bounds(lo, hi, segment_size)
+    if workers <= 1:
+        for seg_lo, seg_hi in bounds:
+            yield sieve_segment(seg_lo, seg_hi, primes)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for seg_lo, seg_hi in bounds:
+            pending.append(pool.submit(sieve_segment, seg_lo, seg_hi, primes))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+# Same as prime_segments, but one prime at a time as Python ints
+def primes_in_range(lo, hi, workers=1, segment_size=SEGMENT_SIZE):
+    for segment in prime_segments(lo, hi, workers, segment_size):
+        yield from segment.tolist()
+
+
+# Checks a sample of the sieve's output against miller_rabin: some of the primes it found, and some
+# odd numbers in the range it didn't report. Returns the numbers the two disagree on
+def cross_check(primes, lo, hi, samples=1000, k=20):
+    primes = np.asarray(primes)
+    mismatches = []
+    if len(primes):
+        for N in np.random.choice(primes, min(samples, len(primes)), replace=False).tolist():
+            if miller_rabin(N, k) != 'prime':
+                mismatches.append(N)
+
+    for _ in range(samples):
+        N = random.randrange(lo, hi) | 1
+        i = np.searchsorted(primes, N)
+        reported = i < len(primes) and primes[i] == N
+        if N < hi and not reported and miller_rabin(N, k) == 'prime':
+            mismatches.append(N)
+    return mismatches
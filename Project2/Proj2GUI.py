@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 
 
-import math
-import random
 import signal
 import sys
-import time
+
+import numpy as np
 
 from which_pyqt import PYQT_VER
 
@@ -25,10 +24,18 @@ else:
 
 # Import the code with the actual implementation
 from convex_hull import *
+from point_workloads import sample_points
 
 
 # from convex_hull_complete_nonthread import *
 
+# Width in pixels of the dot drawn for each point
+POINT_SIZE = 3.0
+
+# Lines are only antialiased when there are at most this many, since a few thousand small leaf hulls
+# look the same either way and draw about twice as fast without it
+ANTIALIAS_MAX_LINES = 2000
+
 
 # This class controls the visual stuff in the GUI.  An instance of it is passed to the solver
 # when it is called so that wrapper functions in the file "convex_hull.py" can update the GUI
@@ -42,6 +49,12 @@ class PointLineView(QWidget):
         self.lineList = {}
         self.status_bar = status_bar
 
+        # the points as arrays by color, and a picture of them at the size it was drawn for. The
+        # picture is only redrawn when the points or the size change
+        self.pointCoords = {}
+        self.pointCache = None
+        self.pointCacheSize = None
+
     def displayStatusText(self, text):
         self.status_bar.showMessage(text)
         self.update()
@@ -49,25 +62,32 @@ class PointLineView(QWidget):
 
     def clearPoints(self):
         self.pointList = {}
+        self.pointCoords = {}
+        self.pointCache = None
 
+    # Lines are removed by identity, so pass the same QLineF objects that were added. One pass over
+    # each color's list instead of a list.remove per line
     def clearLines(self, lines=None):
         if (not lines):
             self.lineList = {}
         else:
+            gone = set(map(id, lines))
             for color in self.lineList:
-                for line in lines:
-                    try:
-                        self.lineList[color].remove(line)
-                    except:
-                        pass
+                self.lineList[color] = [line for line in self.lineList[color] if id(line) not in gone]
+        # update() only asks for a repaint, so a burst of changes gets painted once
         self.update()
-        app.processEvents()  # Why is this necessary????
 
-    def addPoints(self, point_list, color):
+    # coords is the same points as an (n, 2) array, if the caller has one, so they don't have to
+    # be read back out of the QPointFs
+    def addPoints(self, point_list, color, coords=None):
         if color in self.pointList:
             self.pointList[color].extend(point_list)
         else:
             self.pointList[color] = point_list
+        if coords is None:
+            coords = np.array([(point.x(), point.y()) for point in point_list], dtype=np.float64).reshape(-1, 2)
+        self.pointCoords.setdefault(color, []).append(coords)
+        self.pointCache = None
 
     def addLines(self, line_list, color):
         if color in self.lineList:
@@ -75,12 +95,9 @@ class PointLineView(QWidget):
         else:
             self.lineList[color] = line_list
         self.update()
-        app.processEvents()  # Why is this necessary????
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing, True)
 
+    # Half the width and height the unit square is drawn at, keeping the 3:2 shape
+    def scale(self):
         w = self.width() / 2.0
         h = self.height() / 2.0
         w2h_desired_ratio = 1.5
@@ -88,25 +105,52 @@ class PointLineView(QWidget):
             h = w / w2h_desired_ratio
         else:
             w = h * w2h_desired_ratio
+        return w, h
+
+    # time: O(nlogn) for n points. Draws the points onto a transparent pixmap the size of the view.
+    # The points are rounded to pixels with NumPy and only one is drawn per pixel, so a million
+    # points cost no more to draw than the pixels they cover
+    def renderPoints(self):
+        w, h = self.scale()
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        for color, arrays in self.pointCoords.items():
+            coords = np.vstack(arrays)
+            pixels = np.unique(np.round(np.stack((self.width() / 2.0 + w * coords[:, 0],
+                                                  self.height() / 2.0 - h * coords[:, 1]), axis=1)), axis=0)
+            pen = QPen(QColor(color[0], color[1], color[2]))
+            pen.setWidthF(POINT_SIZE)
+            pen.setCapStyle(Qt.RoundCap)
+            painter.setPen(pen)
+            painter.drawPoints(QPolygonF([QPointF(x, y) for x, y in pixels.tolist()]))
+        painter.end()
+        return pixmap
+
+    # The lines go through the painter's transform in one drawLines call per color, and the points
+    # are the cached pixmap
+    def paintEvent(self, event):
+        if self.pointCache is None or self.pointCacheSize != self.size():
+            self.pointCache = self.renderPoints()
+            self.pointCacheSize = self.size()
 
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing, sum(map(len, self.lineList.values())) <= ANTIALIAS_MAX_LINES)
+
+        w, h = self.scale()
         tform = QTransform()
         tform.translate(self.width() / 2.0, self.height() / 2.0)
-        tform.scale(1.0, -1.0)
+        tform.scale(w, -h)
         painter.setTransform(tform)
 
         for color in self.lineList:
-            c = QColor(color[0], color[1], color[2])
-            painter.setPen(c)
-            for line in self.lineList[color]:
-                ln = QLineF(w * line.x1(), h * line.y1(), w * line.x2(), h * line.y2())
-                painter.drawLine(ln)
+            # a zero width pen stays one pixel wide whatever the transform
+            painter.setPen(QPen(QColor(color[0], color[1], color[2]), 0))
+            painter.drawLines(self.lineList[color])
 
-        for color in self.pointList:
-            c = QColor(color[0], color[1], color[2])
-            painter.setPen(c)
-            for point in self.pointList[color]:
-                pt = QPointF(w * point.x(), h * point.y())
-                painter.drawEllipse(pt, 1.0, 1.0)
+        painter.resetTransform()
+        painter.drawPixmap(0, 0, self.pointCache)
 
 
 # Main GUI class
@@ -117,6 +161,7 @@ class Proj2GUI(QMainWindow):
 
         # This is where the points for a problem instance are kept
         self.points = None
+        self.coords = None
 
         # Getting an instance of your solver
         self.solver = ConvexHullSolver()
@@ -124,57 +169,32 @@ class Proj2GUI(QMainWindow):
         # start the GUI
         self.initUI()
 
-    # Generator for new sets of points that represent hull finding problem instances
+    # Generator for new sets of points that represent hull finding problem instances. The points
+    # come from point_workloads as an array, which is kept in self.coords for anything that wants
+    # to skip the QPointFs (with z too for the sphere)
     def newPoints(self):
 
         # TODO - ERROR CHECKING!!!!
         if self.randBySeed.isChecked():
             seed = int(self.randSeed.text())
-            random.seed(seed)
         else:  # do by time
-            random.seed(time.time())
+            seed = None
 
-        ptlist = []
-        unique_xvals = {}
-        max_r = 0.98
-        WIDTH = 1.0
-        HEIGHT = 1.0
         npoints = int(self.npoints.text())
         if self.distribOval.isChecked():
-            while len(ptlist) < npoints:
-                x = random.uniform(-1.0, 1.0)
-                y = random.uniform(-1.0, 1.0)
-                if x ** 2 + y ** 2 <= max_r ** 2:
-                    xval = WIDTH * x
-                    yval = HEIGHT * y
-                    if not xval in unique_xvals:
-                        ptlist.append(QPointF(xval, yval))
-                        unique_xvals[xval] = 1  # dict/map with float keys?
+            distribution = 'uniform'
         elif self.distribSphere.isChecked():
-            while len(ptlist) < npoints:
-                x = random.uniform(-1.0, 1.0)
-                y = random.uniform(-1.0, 1.0)
-                z = random.uniform(-1.0, 1.0)
-                if x ** 2 + y ** 2 + z ** 2 <= max_r ** 2:
-                    xval = WIDTH * x
-                    yval = HEIGHT * y
-                    if not xval in unique_xvals:
-                        ptlist.append(QPointF(xval, yval))
-                        unique_xvals[xval] = 1
+            distribution = 'sphere'
         elif self.distribGaussian.isChecked():
-            while len(ptlist) < npoints:
-                x = random.gauss(0.0, 0.25)
-                y = random.gauss(0.0, 0.25)
-                if x ** 2 + y ** 2 <= max_r ** 2:
-                    xval = WIDTH * x
-                    yval = HEIGHT * y
-                    if not xval in unique_xvals:
-                        ptlist.append(QPointF(xval, yval))
-                        unique_xvals[xval] = 1
-        return ptlist
+            distribution = 'gaussian'
+        else:
+            return []
+        self.coords = sample_points(npoints, distribution, seed)
+        return [QPointF(x, y) for x, y in self.coords[:, :2].tolist()]
 
     # Methods that handle GUI events
     def clearClicked(self):
+        self.solver.stop_animation()
         self.view.clearLines()
         self.view.displayStatusText('')
         self.solveButton.setEnabled(True)
@@ -182,11 +202,12 @@ class Proj2GUI(QMainWindow):
         app.processEvents()  # Why is this necessary?????
 
     def generateClicked(self):
+        self.solver.stop_animation()
         if self.points:
             self.view.clearPoints()
             self.view.clearLines()
         self.points = self.newPoints()
-        self.view.addPoints(self.points, (0, 0, 0))
+        self.view.addPoints(self.points, (0, 0, 0), self.coords[:, :2])
         self.solveButton.setEnabled(True)
         self.view.update()
         app.processEvents()  # Why is this necessary?????
@@ -201,7 +222,10 @@ class Proj2GUI(QMainWindow):
         self.solveButton.setEnabled(False)
         self.view.update()
         app.processEvents()  # Why is this necessary?????
-        self.solver.compute_hull(self.points, self.showRecursion.isChecked(), self.view)
+        if self.hull3d.isChecked() and self.coords.shape[1] == 3:
+            self.solver.compute_hull_3d(self.coords, self.view)
+        else:
+            self.solver.compute_hull(self.points, self.showRecursion.isChecked(), self.view)
         self.generateButton.setEnabled(True)
         self.clearButton.setEnabled(True)
         self.view.update()
@@ -240,6 +264,7 @@ class Proj2GUI(QMainWindow):
         self.randSeed = QLineEdit('0')
 
         self.showRecursion = QCheckBox('Show Recursion')
+        self.hull3d = QCheckBox('3D Hull (Spherical)')
 
         h = QHBoxLayout()
         h.addWidget(self.view)
@@ -275,6 +300,7 @@ class Proj2GUI(QMainWindow):
         h.addWidget(self.randBySeed)
         h.addWidget(self.randSeed)
         h.addStretch(1)
+        h.addWidget(self.hull3d)
         h.addWidget(self.showRecursion)
         vbox.addLayout(h)
 
@@ -0,0 +1,193 @@
+import numpy as np
+
+# Hulls of many small point sets at once. The sets come in ragged: one (N, 2) float64 array with
+# every set's points one after another, and offsets such that set k is coords[offsets[k]:offsets[k + 1]].
+# The sets are laid out as the rows of a padded array, sorted row by row, and Andrew's monotone
+# chain runs on every row side by side: each NumPy step pushes the next point of every set onto that
+# set's stack, so the number of steps follows the biggest set and not the number of sets, and
+# nothing is made per point
+from hull_engine import *
+
+# Sets bigger than this get hull_indices of their own, since they would pad every row of their pass
+BATCH_MAX_SET = 4096
+
+# Cells (sets times the longest set) per padded pass, which keeps each array to 16 MB
+BATCH_CELLS_PER_PASS = 2 ** 21
+
+
+# time: O(m) NumPy steps for the longest row of m points, each over the rows still going.
+# One pass of the monotone chain over every row at once. xs and ys are (m, c), one column per set,
+# each sorted with its lengths[k] points first, and lengths goes longest first. Returns the stack of
+# positions each chain ended up with, column k holding sizes[k] of them, and the columns where an
+# orientation was too close to call in floating point
+def batch_chains(xs, ys, lengths):
+    m, c = xs.shape
+    stack_x = np.empty((m, c))
+    stack_y = np.empty((m, c))
+    stack = np.empty((m, c), dtype=np.int64)
+    sizes = np.zeros(c, dtype=np.int64)
+    unsure = np.zeros(c, dtype=bool)
+    # lengths is sorted longest first, so the sets still going at step t are a prefix
+    going = np.searchsorted(-lengths, -np.arange(m), side='left')
+    for t, count in enumerate(going.tolist()):
+        px = xs[t, :count]
+        py = ys[t, :count]
+        # pop while the last two points and p don't make a right turn
+        sets = np.flatnonzero(sizes[:count] >= 2)
+        while len(sets):
+            top = sizes[sets]
+            ax = stack_x[top - 2, sets]
+            ay = stack_y[top - 2, sets]
+            det_left = (stack_x[top - 1, sets] - ax) * (py[sets] - ay)
+            det_right = (stack_y[top - 1, sets] - ay) * (px[sets] - ax)
+            det = det_left - det_right
+            # written so a NaN from an overflow counts as unsure
+            unsure[sets[~(np.abs(det) > ORIENTATION_ERROR_BOUND * (np.abs(det_left) + np.abs(det_right)))]] = True
+            sets = sets[det >= 0]
+            sizes[sets] -= 1
+            sets = sets[sizes[sets] >= 2]
+        top = sizes[:count]
+        columns = np.arange(count)
+        stack_x[top, columns] = px
+        stack_y[top, columns] = py
+        stack[top, columns] = t
+        sizes[:count] += 1
+    return stack, sizes, unsure
+
+
+# time: O(cm) space: O(cm). octagon_cull for every row of a (c, m) array at once: the points of each
+# row strictly inside the octagon of that row's extreme points. Rows have to be padded with copies of
+# one of their own points. The float error bound is taken once per edge, from the row's extent, which
+# is never smaller than octagon_cull's per point bound. Corners that coincide leave zero length edges,
+# which cull nothing, so they are skipped
+def octagon_inside(xs, ys):
+    rows = np.arange(len(xs))[:, None]
+    # counter-clockwise: left, bottom left, bottom, bottom right, right, top right, top, top left
+    corners = np.stack([np.argmin(xs, axis=1), np.argmin(xs + ys, axis=1), np.argmin(ys, axis=1),
+                        np.argmax(xs - ys, axis=1), np.argmax(xs, axis=1), np.argmax(xs + ys, axis=1),
+                        np.argmax(ys, axis=1), np.argmax(ys - xs, axis=1)], axis=1)
+    corner_x = xs[rows, corners]
+    corner_y = ys[rows, corners]
+    width = corner_x[:, 4] - corner_x[:, 0]
+    height = corner_y[:, 6] - corner_y[:, 2]
+    inside = np.ones(xs.shape, dtype=bool)
+    for k in range(8):
+        ax, ay = corner_x[:, k], corner_y[:, k]
+        dx = corner_x[:, (k + 1) % 8] - ax
+        dy = corner_y[:, (k + 1) % 8] - ay
+        err = np.where((dx == 0) & (dy == 0), -np.inf, ORIENTATION_ERROR_BOUND * (np.abs(dx) * height + np.abs(dy) * width))
+        inside &= dx[:, None] * (ys - ay[:, None]) - dy[:, None] * (xs - ax[:, None]) > err[:, None]
+    inside[rows, corners] = False
+    return inside
+
+
+# Moves the cells of each row where keep is set to the front of the row, in order, and cuts the rows
+# down to the longest. Returns the new row lengths and the arrays, with the padding set to fill
+def compact_rows(keep, arrays, fills):
+    lengths = keep.sum(axis=1)
+    shifted = np.argsort(~keep, axis=1, kind='stable')[:, :lengths.max()]
+    valid = np.arange(shifted.shape[1]) < lengths[:, None]
+    return lengths, [np.where(valid, np.take_along_axis(array, shifted, axis=1), fill) for array, fill in zip(arrays, fills)]
+
+
+# time: O(cm logm) space: O(cm). Hulls of the given sets, all at most m points long, in one padded
+# pass. Returns the sets in the order their hulls come out, each one's hull size, the hulls one after
+# another as rows into their sets, and the sets that need the exact test
+def batch_pass(coords, offsets, sets, m):
+    lengths = offsets[sets + 1] - offsets[sets]
+    columns = np.arange(m)
+    valid = columns < lengths[:, None]
+    rows = np.where(valid, offsets[sets, None] + columns, offsets[sets, None])
+    xs = coords[rows, 0]
+    ys = coords[rows, 1]
+
+    # cull each row to its octagon, then sort what's left by x then y (the padding goes last) and
+    # drop the repeats of duplicate points
+    order = np.broadcast_to(columns, xs.shape)
+    lengths, (order, xs, ys) = compact_rows(valid & ~octagon_inside(xs, ys), (order, xs, ys), (0, np.inf, np.inf))
+    by_y = np.argsort(ys, axis=1, kind='stable')
+    by_xy = np.take_along_axis(by_y, np.argsort(np.take_along_axis(xs, by_y, axis=1), axis=1, kind='stable'), axis=1)
+    order = np.take_along_axis(order, by_xy, axis=1)
+    xs = np.take_along_axis(xs, by_xy, axis=1)
+    ys = np.take_along_axis(ys, by_xy, axis=1)
+    repeat = np.zeros(xs.shape, dtype=bool)
+    repeat[:, 1:] = (xs[:, 1:] == xs[:, :-1]) & (ys[:, 1:] == ys[:, :-1]) & (columns[1:xs.shape[1]] < lengths[:, None])
+    if repeat.any():
+        lengths, (order, xs, ys) = compact_rows((np.arange(xs.shape[1]) < lengths[:, None]) & ~repeat,
+                                                (order, xs, ys), (0, np.inf, np.inf))
+
+    # the chains want a column per set, longest first. The lower hull is the upper hull walked
+    # backwards, so it gets every row reversed
+    by_length = np.argsort(-lengths, kind='stable')
+    lengths = lengths[by_length]
+    order = order[by_length]
+    xs = xs[by_length]
+    ys = ys[by_length]
+    columns = np.arange(xs.shape[1])
+    backwards = np.maximum(lengths[:, None] - 1 - columns, 0)
+    upper, upper_sizes, upper_unsure = batch_chains(xs.T, ys.T, lengths)
+    lower, lower_sizes, lower_unsure = batch_chains(np.take_along_axis(xs, backwards, axis=1).T,
+                                                    np.take_along_axis(ys, backwards, axis=1).T, lengths)
+
+    # each hull is its upper chain, then its lower chain without the two ends (one point sets have
+    # the same point as both chains, so they just keep the upper one)
+    hull = np.hstack((upper.T, lengths[:, None] - 1 - lower.T))
+    kept = np.hstack((columns < upper_sizes[:, None], (columns >= 1) & (columns < lower_sizes[:, None] - 1)))
+    hulls = np.take_along_axis(np.hstack((order, order)), np.where(kept, hull, 0), axis=1)[kept]
+    sets = sets[by_length]
+    return sets, kept.sum(axis=1), hulls, sets[upper_unsure | lower_unsure]
+
+
+# Concatenation of the ranges firsts[k]:firsts[k] + counts[k], without a Python loop
+def ragged_ranges(firsts, counts):
+    ends = np.cumsum(counts)
+    return np.repeat(firsts - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)
+
+
+# time: O(Nlogm) for N points in sets of at most m, space: O(N).
+# Hull of every set in a ragged batch. Returns two arrays in the same ragged layout: indices, with
+# the hull of set k in indices[hull_offsets[k]:hull_offsets[k + 1]] as rows into that set (what
+# hull_indices gives for coords[offsets[k]:offsets[k + 1]]), and hull_offsets. The few sets with an
+# orientation too close to call are redone with hull_indices, so the hulls are exactly the same
+def batch_hull_indices(coords, offsets):
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+
+    # passes of similar length sets, longest first, each as big as BATCH_CELLS_PER_PASS allows
+    small = np.flatnonzero((lengths > 0) & (lengths <= BATCH_MAX_SET))
+    small = small[np.argsort(-lengths[small], kind='stable')]
+    pieces = []
+    redo = np.flatnonzero(lengths > BATCH_MAX_SET).tolist()
+    first = 0
+    while first < len(small):
+        m = lengths[small[first]]
+        last = first + max(1, BATCH_CELLS_PER_PASS // m)
+        sets, sizes, hulls, unsure = batch_pass(coords, offsets, small[first:last], m)
+        pieces.append((sets, sizes, hulls))
+        redo += unsure.tolist()
+        first = last
+
+    # the batched hulls of the sets being redone are dropped, so they can't spill into the next set
+    exact = {k: hull_indices(coords[offsets[k]:offsets[k + 1]]) for k in redo}
+    redone = np.zeros(len(lengths), dtype=bool)
+    redone[redo] = True
+    sizes = np.zeros(len(lengths), dtype=np.int64)
+    for k, hull in exact.items():
+        sizes[k] = len(hull)
+    for p, (sets, set_sizes, hulls) in enumerate(pieces):
+        batched = ~redone[sets]
+        pieces[p] = sets[batched], set_sizes[batched], hulls[np.repeat(batched, set_sizes)]
+        sizes[pieces[p][0]] = pieces[p][1]
+    hull_offsets = np.concatenate(([0], np.cumsum(sizes)))
+    indices = np.empty(hull_offsets[-1], dtype=np.int64)
+    for sets, set_sizes, hulls in pieces:
+        indices[ragged_ranges(hull_offsets[sets], set_sizes)] = hulls
+    for k, hull in exact.items():
+        indices[hull_offsets[k]:hull_offsets[k + 1]] = hull
+    return indices, hull_offsets
+
+
+# Splits batch_hull_indices' output into one array per set
+def split_hulls(indices, hull_offsets):
+    return np.split(indices, hull_offsets[1:-1])
@@ -1,14 +1,26 @@
 from which_pyqt import PYQT_VER
 
 if PYQT_VER == 'PYQT5':
-    from PyQt5.QtCore import QLineF, QPointF, QObject
+    from PyQt5.QtCore import QLineF, QPointF, QObject, QTimer
 elif PYQT_VER == 'PYQT4':
-    from PyQt4.QtCore import QLineF, QPointF, QObject
+    from PyQt4.QtCore import QLineF, QPointF, QObject, QTimer
 else:
     raise Exception('Unsupported Version of PyQt: {}'.format(PYQT_VER))
 
+import queue
+import threading
 import time
-import math
+
+import numpy as np
+
+# The divide and conquer itself lives in hull_engine.py and the other algorithms in
+# hull_algorithms.py. Both work on NumPy arrays, so Qt objects only show up in this file
+from hull_engine import *
+from hull_algorithms import *
+from stream_hull import CHUNK_POINTS, stream_hull
+from dynamic_hull import DynamicHull
+from hull3d import hull3d_faces
+from hull_events import hull_events
 
 # Some global color constants that might be useful
 RED = (255, 0, 0)
@@ -19,209 +31,13 @@ BLUE = (0, 0, 255)
 #
 PAUSE = 0.25
 
-# nlogn time and space. logn for recursion and n for merge calls
-def convex_hull_solver(points):
-    # Base case- if length of array is 4 we return in
-    if len(points) < 4:
-        return points
-
-    # get new left and right array by calling function to split in half
-    left, right = get_halves(points)
-    # recursive calls
-    left = convex_hull_solver(left)
-    right = convex_hull_solver(right)
-
-    # if right or left array has 3 points, we need to order clockwise based on slope
-    if len(right) == 3 and compute_slope(right[0], right[2]) > compute_slope(right[0], right[1]):
-        # time: O(1) space: O(1)
-        temp = right[1]
-        right[1] = right[2]
-        right[2] = temp
-    if len(left) == 3 and compute_slope(left[0], left[2]) > compute_slope(left[0], left[1]):
-        # time: O(1) space: O(1) because hull size is max of 3
-        temp = left[1]
-        left[1] = left[2]
-        left[2] = temp
-    hull = merge_hull(left, right)
-
-    # return final array
-    return hull
-
-# time: O(1) # space O(n) because we have two n/2 arrays
-def get_halves(n):
-    # takes in array n as parameter and returns two arrays splitting n from the middle
-    half = len(n) // 2
-    return n[:half], n[half:]
-
-
-# time: O(n) because we call top_tan_indexes and bottom_tan_indexes which are both O(n)
-# space: O(n) because we are creating 2 arrays of size n/2 worst case
-def merge_hull(left, right):
-    # calls functions to find top and bottom tangents
-    top_tan_indexes = find_top_tan(left, right)
-    bottom_tan_indexes = find_bottom_tan(left, right)
-    # merge the lists of top and bottom tangents together
-    new_hull_indexes = top_tan_indexes + bottom_tan_indexes
-    sorted_hull = merge_clockwise(left, right, new_hull_indexes)
-
-    return sorted_hull
-
-# time: would be O(2n) but simplifies to O(n) because worst case is you keep all points
-# space: O(n)- create new list of size n worst case
-def merge_clockwise(left, right, tan_indexes):
-    # this function merges the two hulls and sorts them clockwise
-    clockwise_list = []
-
-    # start with left most point in array and append up until upper left tangent
-    for point in left[:tan_indexes[0] + 1]:
-        clockwise_list.append(point)
-
-    # if upper right tangent index is greater than bottom right tangent index loop to end of right list
-    # and then all the way back to the bottom right tangent point (including bottom right point)
-    if tan_indexes[1] > tan_indexes[2]:
-        for point in right[tan_indexes[1]: len(right)]:
-            clockwise_list.append(point)
-        for point in right[:tan_indexes[2] + 1]:
-            clockwise_list.append(point)
-    else:
-        for point in right[tan_indexes[1]: tan_indexes[2] + 1]:
-            clockwise_list.append(point)
-
-    # if the bottom right tangent index is not 0, append all points until end of right list
-    if tan_indexes[3] != 0:
-        for point in left[tan_indexes[3]:len(left)]:
-            clockwise_list.append(point)
-
-    return clockwise_list
-
-# time: would be O(2n) but simplifies to O(n) because worst case is you keep all points
-# space: O(1)
-def find_top_tan(left, right):
-    new_hull_indexes = []
-
-    # O(n) being added to total complexity but dropped because we are adding
-    curr_left = find_rightmost_ind(left)
-    curr_right = 0
-    is_upper_tangent = False
-    curr_slope = compute_slope(left[curr_left], right[curr_right])
-    while not is_upper_tangent:
-        left_updated = False
-        right_updated = False
-        is_tangent_left = False
-        # start outer loop that runs until no changes in the left or right hulls have been made
-        while not is_tangent_left:
-            # account for the chance that we need to move clockwise past index 0 or left array
-            if curr_left == 0:
-                next_left = len(left) - 1
-            else:
-                next_left = curr_left - 1
-            new_slope = compute_slope(left[next_left], right[curr_right])
-            if new_slope < curr_slope:
-                curr_slope = new_slope
-                curr_left = next_left
-                left_updated = True
-            else:
-                is_tangent_left = True
-        is_tangent_right = False
-        curr_slope = compute_slope(left[curr_left], right[curr_right])
-        # start outer loop that runs until no changes in the left or right hulls have been made
-        while not is_tangent_right:
-            next_right = curr_right + 1
-            if curr_right == len(right) - 1:
-                next_right = 0
-            new_slope = compute_slope(left[curr_left], right[next_right])
-            if new_slope > curr_slope:
-                curr_slope = new_slope
-                curr_right = next_right
-                right_updated = True
-            else:
-                is_tangent_right = True
-        # If we updated a left or right point we need to check again, otherwise we are done
-        if left_updated or right_updated:
-            is_upper_tangent = False
-        else:
-            is_upper_tangent = True
-
-    # append top tangent points in clockwise order
-    new_hull_indexes.append(curr_left)
-    new_hull_indexes.append(curr_right)
-    return new_hull_indexes
-
-# time: would be O(2n) but simplifies to O(n) because worst case is you keep all points
-# space: O(1)
-def find_bottom_tan(left, right):
-    new_hull_indexes = []
-    curr_left = find_rightmost_ind(left)
-    curr_right = 0
-    is_upper_tangent = False
-
-    curr_slope = compute_slope(left[curr_left], right[curr_right])
-
-    while not is_upper_tangent:
-        left_updated = False
-        right_updated = False
-        is_tangent_left = False
-
-        while not is_tangent_left:
-
-            # if current right index is last point of array our next point will be the beginning of array
-            if curr_left == len(left) - 1:
-                next_left = 0
-            else:
-                next_left = curr_left + 1
-
-            new_slope = compute_slope(left[next_left], right[curr_right])
-
-            if new_slope > curr_slope:
-                curr_slope = new_slope
-                curr_left = next_left
-                left_updated = True
-            else:
-                is_tangent_left = True
-
-        is_tangent_right = False
-        curr_slope = compute_slope(left[curr_left], right[curr_right])
-
-        while not is_tangent_right:
-
-            # if the current right index is zero our next point will be starting at end or array
-            if curr_right == 0:
-                next_right = len(right) - 1
-            else:
-                next_right = curr_right - 1
-
-            new_slope = compute_slope(left[curr_left], right[next_right])
-
-            if new_slope < curr_slope:
-                curr_slope = new_slope
-                curr_right = next_right
-                right_updated = True
-            else:
-                is_tangent_right = True
-
-        # If we updated a left or right point we need to check again, otherwise we are done
-        if left_updated or right_updated:
-            is_upper_tangent = False
-        else:
-            is_upper_tangent = True
-
-    # append top tangent points in clockwise order
-    new_hull_indexes.append(curr_right)
-    new_hull_indexes.append(curr_left)
-    return new_hull_indexes
-
-# time: O(n) space:
-def find_rightmost_ind(arr):
-    right_ind = 0
-    for i in range(len(arr)):
-        if arr[i].x() > arr[right_ind].x():
-            right_ind = i
-    return right_ind
-
-# time: O(1) space:
-def compute_slope(p1, p2):
-    return (p2.y() - p1.y()) / (p2.x() - p1.x())
+# The animated solve plays a step per frame, PAUSE seconds apart, until it falls behind. Then each
+# frame takes this fraction of the steps waiting
+CATCH_UP_FRAMES = 20
 
+# Most steps the solve's worker thread gets ahead of the animation. Once this many are waiting it
+# blocks until a frame takes some, so the hulls waiting to be drawn never pile up past this
+EVENT_QUEUE_SIZE = 4096
 
 #
 # This is the class you have to complete.
@@ -232,6 +48,15 @@ class ConvexHullSolver(QObject):
     def __init__(self):
         super().__init__()
         self.pause = False
+        # the hull kept up to date by update_hull, and the lines it has on the view by edge
+        self.dynamic = DynamicHull()
+        self.hull_lines = {}
+        # the running animation: the worker's events not played yet, what's on screen
+        self.timer = None
+        self.stopped = None
+        self.events = None
+        self.hulls = {}
+        self.tangents = None
 
     # Some helper methods that make calls to the GUI, allowing us to send updates
     # to be displayed.
@@ -260,31 +85,198 @@ class ConvexHullSolver(QObject):
         self.view.displayStatusText(text)
 
     # This is the method that gets called by the GUI and actually executes
-    # the finding of the hull
-    def compute_hull(self, points, pause, view):
+    # the finding of the hull. algorithm is one of the names in HULL_ALGORITHMS, or 'auto'
+    # to let choose_algorithm pick from a sample of the points
+    def compute_hull(self, points, pause, view, algorithm='auto'):
         self.pause = pause
         self.view = view
         assert (type(points) == list and type(points[0]) == QPointF)
 
-        t1 = time.time()
+        # this is the only place the points are QPointFs, the engine gets an (n, 2) array
+        coords = np.array([(point.x(), point.y()) for point in points], dtype=np.float64)
+        if pause:
+            # the merges run on a worker thread and play back on a timer, so this returns at once
+            self.animate(coords)
+            return
+        if algorithm == 'auto':
+            algorithm = choose_algorithm(coords)
 
-        # time complexity O(nlogn)
-        # space complexity 0(n)
-        ordered_points = sorted(points, key=lambda QPointF: QPointF.x())
+        status = ''
+        if algorithm == 'divide':
+            t0 = time.time()
 
-        t2 = time.time()
+            # time complexity O(n)
+            # drop everything inside the extreme point octagon so the sort only sees what's left
+            keep = np.flatnonzero(octagon_cull(coords))
+            culled = len(coords) - len(keep)
+            status = ', {} points culled'.format(culled)
 
-        print('Time Elapsed (Sorting): {:3.3f} sec'.format(t2 - t1))
+            t1 = time.time()
 
-        t3 = time.time()
-        hull = convex_hull_solver(ordered_points)
+            print('Time Elapsed (Culling): {:3.3f} sec, culled {} of {} points'.format(t1 - t0, culled, len(coords)))
+
+            # time complexity O(nlogn)
+            # space complexity 0(n)
+            order = keep[sort_order(coords[keep])]
+            sorted_coords = coords[order]
+
+            t2 = time.time()
+
+            print('Time Elapsed (Sorting): {:3.3f} sec'.format(t2 - t1))
+
+            t3 = time.time()
+            hull = order[hull_of_sorted(sorted_coords)].tolist()
+        else:
+            # the other algorithms sort (or don't) on their own
+            t3 = time.time()
+            hull = solve_hull(coords, algorithm)[0].tolist()
 
         t4 = time.time()
-        polygon = [QLineF(hull[i], hull[(i + 1) % len(hull)]) for i in range(len(hull))]
+        polygon = [QLineF(points[hull[i]], points[hull[(i + 1) % len(hull)]]) for i in range(len(hull))]
         # when passing lines to the display, pass a list of QLineF objects.  Each QLineF
         # object can be created with two QPointF objects corresponding to the endpoints
         self.showHull(polygon, RED)
-        self.showText('Time Elapsed (Convex Hull): {:3.3f} sec'.format(t4 - t3))
+        self.showText('Time Elapsed (Convex Hull, {}): {:3.3f} sec{}'.format(algorithm, t4 - t3, status))
+
+    # Starts an animated divide and conquer on coords. A worker thread runs hull_events and queues
+    # what it yields, and play_frame draws them on this thread, a frame every PAUSE seconds
+    def animate(self, coords):
+        self.stop_animation()
+        self.pause = False
+        self.stopped = threading.Event()
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.hulls = {}
+        self.tangents = None
+        threading.Thread(target=self.record_events, args=(coords, self.events, self.stopped), daemon=True).start()
+        self.started = time.time()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.play_frame)
+        self.timer.start(int(PAUSE * 1000))
+
+    # Runs on the worker thread. Nothing here touches the view. put() waits while the queue is full
+    def record_events(self, coords, events, stopped):
+        for event in hull_events(coords):
+            if stopped.is_set():
+                return
+            events.put(event)
+
+    # Emptying the queue after setting stopped lets a worker waiting on a full queue finish its put,
+    # see stopped and quit
+    def stop_animation(self):
+        if self.timer is not None:
+            self.stopped.set()
+            self.timer.stop()
+            self.timer = None
+            while not self.events.empty():
+                self.events.get_nowait()
+
+    # time: O(k) for the k hull vertices in the steps played. Plays the next steps of the animation:
+    # only the hulls those steps merged away get erased and only the new ones get lines made, so the
+    # whole animation makes about as many lines as the merges touch points. At the end the final hull
+    # replaces everything
+    def play_frame(self):
+        steps = max(1, self.events.qsize() // CATCH_UP_FRAMES)
+        erased = []
+        drawn = []
+        tangents = self.tangents
+        final = None
+        while steps:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            steps -= 1
+            if event[0] == 'leaves':
+                for key, hull in event[1]:
+                    self.hulls[key] = self.polygon(hull)
+                    drawn += self.hulls[key]
+            elif event[0] == 'tangents':
+                tangents = [QLineF(QPointF(*a), QPointF(*b)) for a, b in event[3].tolist()]
+            elif event[0] == 'merge':
+                kind, left, right, hull = event
+                erased += self.hulls.pop(left) + self.hulls.pop(right)
+                self.hulls[left] = self.polygon(hull)
+                drawn += self.hulls[left]
+                tangents = None
+            else:
+                final = event[1]
+
+        if final is not None:
+            self.stop_animation()
+            self.view.clearLines()
+            self.showHull(next(iter(self.hulls.values()), []), RED)
+            self.showText('Time Elapsed (Convex Hull, animated): {:3.3f} sec'.format(time.time() - self.started))
+            return
+        if self.tangents is not None and tangents is not self.tangents:
+            erased += self.tangents
+        if erased:
+            self.eraseHull(erased)
+        if drawn:
+            self.showHull(drawn, GREEN)
+        if tangents is not None and tangents is not self.tangents:
+            self.showTangent(tangents, BLUE)
+        self.tangents = tangents
+
+    # Closed polygon through the rows of a (k, 2) array, as QLineFs
+    def polygon(self, hull):
+        corners = [QPointF(x, y) for x, y in hull.tolist()]
+        return [QLineF(corners[i], corners[(i + 1) % len(corners)]) for i in range(len(corners))]
+
+    # Same as compute_hull, but for a file of points too big to load: raw float64 x, y pairs or a
+    # .csv, read chunk_points at a time. Only the hull ever becomes QPointFs
+    def compute_hull_file(self, path, view, chunk_points=CHUNK_POINTS):
+        self.pause = False
+        self.view = view
+
+        t1 = time.time()
+        hull, rows = stream_hull(path, chunk_points)
+        t2 = time.time()
+
+        corners = [QPointF(x, y) for x, y in hull.tolist()]
+        polygon = [QLineF(corners[i], corners[(i + 1) % len(corners)]) for i in range(len(corners))]
+        self.showHull(polygon, RED)
+        self.showText('Time Elapsed (Convex Hull, streamed): {:3.3f} sec'.format(t2 - t1))
+
+    # 3D hull of an (n, 3) array of points. The view is flat, so the triangles' edges are drawn
+    # looking down the z axis
+    def compute_hull_3d(self, points, view):
+        self.pause = False
+        self.view = view
+
+        t1 = time.time()
+        faces = hull3d_faces(points)
+        t2 = time.time()
+
+        edges = np.unique(np.sort(np.stack((faces, np.roll(faces, -1, axis=1)), axis=2).reshape(-1, 2), axis=1), axis=0)
+        corners = points[:, :2].tolist()
+        lines = [QLineF(QPointF(*corners[a]), QPointF(*corners[b])) for a, b in edges.tolist()]
+        self.showHull(lines, RED)
+        self.showText('Time Elapsed (Convex Hull, 3D): {:3.3f} sec, {} faces'.format(t2 - t1, len(faces)))
+
+    # Keeps a hull on the view while points come and go, without recomputing it. added and removed
+    # are lists of QPointFs. Only the hull edges that changed get erased or drawn
+    def update_hull(self, view, added=(), removed=()):
+        self.pause = False
+        self.view = view
+
+        t1 = time.time()
+        for point in removed:
+            self.dynamic.remove(point.x(), point.y())
+        for point in added:
+            self.dynamic.insert(point.x(), point.y())
+        edges = self.dynamic.edges()
+        t2 = time.time()
+
+        current = set(edges)
+        gone = [edge for edge in self.hull_lines if edge not in current]
+        if gone:
+            self.eraseHull([self.hull_lines.pop(edge) for edge in gone])
+        new = [edge for edge in edges if edge not in self.hull_lines]
+        for edge in new:
+            self.hull_lines[edge] = QLineF(QPointF(*edge[0]), QPointF(*edge[1]))
+        if new:
+            self.showHull([self.hull_lines[edge] for edge in new], RED)
+        self.showText('Time Elapsed (Convex Hull, dynamic): {:3.3f} sec, {} edges redrawn'.format(t2 - t1, len(gone) + len(new)))
 
 
 
@@ -310,3 +302,26 @@ class ConvexHullSolver(QObject):
 
 
 
+# Reproduced with the headless runner, for the NumPy engine: python hull_benchmark.py --engines divide
+# --distributions uniform --trials 5 --sizes 10 100 1000 10000 100000 500000 1000000 (seed 312).
+# The tables above are the original QPointF implementation, timed by hand through the GUI, and are
+# kept as they were. Here k = mean measured time/nlog2(n), and below n = 1000 the time is mostly the
+# fixed cost of the NumPy calls
+
+# Convex Hull (merge) Elapsed Times
+# When n = 10 [0.0001, 0.0000, 0.0000, 0.0000, 0.0001]        k = 1.46e-06
+# When n = 100 [0.0001, 0.0001, 0.0001, 0.0000, 0.0000]       k = 8.44e-08
+# When n = 1000 [0.0008, 0.0005, 0.0004, 0.0004, 0.0004]      k = 5.06e-08
+# When n = 10000 [0.0020, 0.0018, 0.0018, 0.0019, 0.0018]     k = 1.4e-08
+# When n = 100000 [0.0173, 0.0167, 0.0168, 0.0168, 0.0166]    k = 1.01e-08
+# When n = 500000 [0.0833, 0.0836, 0.0807, 0.0810, 0.0837]    k = 8.71e-09
+# When n = 1000000 [0.1684, 0.1647, 0.1695, 0.1828, 0.1663]   k = 8.55e-09
+
+# Culling and Sorting Elapsed Times
+# When n = 10 [0.0003, 0.0002, 0.0001, 0.0001, 0.0001]        k = 5.22e-06
+# When n = 100 [0.0002, 0.0002, 0.0002, 0.0002, 0.0002]       k = 2.93e-07
+# When n = 1000 [0.0003, 0.0003, 0.0003, 0.0003, 0.0003]      k = 2.86e-08
+# When n = 10000 [0.0010, 0.0010, 0.0009, 0.0014, 0.0010]     k = 8.08e-09
+# When n = 100000 [0.0108, 0.0121, 0.0122, 0.0118, 0.0121]    k = 7.11e-09
+# When n = 500000 [0.0704, 0.0722, 0.0696, 0.0697, 0.0718]    k = 7.48e-09
+# When n = 1000000 [0.1587, 0.1421, 0.1420, 0.1392, 0.1517]   k = 7.36e-09
@@ -0,0 +1,227 @@
+import numpy as np
+
+# Convex hull of a set of points that changes one point at a time, after Overmars and van Leeuwen.
+# The points sit at the leaves of a balanced tree in sorted order. Every node keeps the upper and
+# lower hull chains of the points below it, which are two pieces of its children's chains joined by
+# a bridge, so an insert or delete only has to find new bridges on the path back up to the root.
+# Where Overmars and van Leeuwen split and join concatenable queues, the chains here are Python
+# lists cut with slices: the orientation tests per update stay polylog, and the copying is a
+# memmove of at most the hull size per level
+from hull_engine import *
+
+# A subtree gets rebuilt perfectly balanced once one of its children holds more than this fraction
+# of its points. That keeps the tree O(logn) deep at an amortized O(logn) rebuilt nodes per update
+BALANCE = 0.7
+
+
+# One tree node. Leaves hold a single point, internal nodes always have two children. top is the
+# largest point below (in sorted order), which is what the search down the tree compares against
+class HullNode:
+    __slots__ = ('left', 'right', 'size', 'top', 'upper', 'lower')
+
+    def __init__(self, point):
+        self.left = None
+        self.right = None
+        self.size = 1
+        self.top = point
+        self.upper = [point]
+        self.lower = [point]
+
+
+# time: O(logm) space: O(1). Position of the tangent from p to the upper chain, a clockwise run of
+# hull points entirely after p in sorted order: the last position where the chain still turns left
+# of (or runs straight along) the line from p
+def chain_tangent(xs, ys, p, chain):
+    lo = 0
+    hi = len(chain) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if orientation(xs, ys, p, chain[mid], chain[mid + 1]) >= 0:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+# time: O(logl * logr) space: O(1). Bridge between two upper chains, left entirely before right in
+# sorted order. Binary searches left for the last point that has the next one strictly left of the
+# line to its own tangent on right. A point of left on the bridge line sits between its ends, as does
+# one of right (which chain_tangent skips), so the joined chain stays strict. Returns the positions
+# of the bridge's ends in left and right
+def chain_bridge(xs, ys, left, right):
+    lo = 0
+    hi = len(left) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        tangent = right[chain_tangent(xs, ys, left[mid], right)]
+        if orientation(xs, ys, left[mid], tangent, left[mid + 1]) > 0:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo, chain_tangent(xs, ys, left[lo], right)
+
+
+# Hull of a set of points under inserts and removes. Points are (x, y) pairs and the set is a
+# multiset: a point inserted twice has to be removed twice before it leaves the hull. hull() gives
+# the vertices clockwise from the leftmost point with duplicates and points in the middle of an edge
+# left out, the same as hull_engine.hull_indices
+class DynamicHull:
+
+    def __init__(self, points=()):
+        # coordinates by point id, the free ids and the id and copy count of every distinct point
+        self.xs = []
+        self.ys = []
+        self.free = []
+        self.ids = {}
+        self.counts = {}
+        self.root = None
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points):
+            for key in map(tuple, points.tolist()):
+                self.counts[key] = self.counts.get(key, 0) + 1
+            leaves = [HullNode(self.new_id(x, y)) for x, y in points[sort_order(points)].tolist()]
+            self.root = self.build(leaves, 0, len(leaves))
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def __contains__(self, point):
+        return tuple(point) in self.counts
+
+    def new_id(self, x, y):
+        if self.free:
+            p = self.free.pop()
+            self.xs[p] = x
+            self.ys[p] = y
+        else:
+            p = len(self.xs)
+            self.xs.append(x)
+            self.ys.append(y)
+        self.ids[(x, y)] = p
+        return p
+
+    # time: O(h) for a hull of h points. Recomputes a node's chains from its children's: the upper
+    # chain runs left to right, the lower one right to left, so the lower bridge has the right child
+    # first. Turning the points half way round doesn't change an orientation, so the same bridge
+    # search works for both
+    def pull(self, node):
+        left, right = node.left, node.right
+        node.size = left.size + right.size
+        node.top = right.top
+        i, j = chain_bridge(self.xs, self.ys, left.upper, right.upper)
+        node.upper = left.upper[:i + 1] + right.upper[j:]
+        i, j = chain_bridge(self.xs, self.ys, right.lower, left.lower)
+        node.lower = right.lower[:i + 1] + left.lower[j:]
+
+    # time: O(m log^2 m) space: O(m). Balanced tree over leaves[lo:hi], which are in sorted order
+    def build(self, leaves, lo, hi):
+        if hi - lo == 1:
+            return leaves[lo]
+        mid = (lo + hi) // 2
+        node = HullNode(None)
+        node.left = self.build(leaves, lo, mid)
+        node.right = self.build(leaves, mid, hi)
+        self.pull(node)
+        return node
+
+    # The leaves under node, in sorted order
+    def leaves(self, node):
+        leaves = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.left is None:
+                leaves.append(node)
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+        return leaves
+
+    # Points node at child in place of old, whether it's the left or the right one
+    def replace(self, node, old, child):
+        if node is None:
+            self.root = child
+        elif node.left is old:
+            node.left = child
+        else:
+            node.right = child
+
+    # Walks down to the leaf where key is or would go. Returns the leaf and the nodes above it
+    def search(self, key):
+        path = []
+        node = self.root
+        while node.left is not None:
+            path.append(node)
+            top = node.left.top
+            node = node.left if key <= (self.xs[top], self.ys[top]) else node.right
+        return node, path
+
+    # time: O(log^3 n) amortized. Fixes up the path from the root down to a node that just changed.
+    # The highest node that is out of balance gets rebuilt, and everything above it gets new bridges
+    def rebalance(self, path):
+        for node in path:
+            node.size = node.left.size + node.right.size
+        for k, node in enumerate(path):
+            if max(node.left.size, node.right.size) > BALANCE * node.size:
+                leaves = self.leaves(node)
+                self.replace(path[k - 1] if k else None, node, self.build(leaves, 0, len(leaves)))
+                path = path[:k]
+                break
+        for node in reversed(path):
+            self.pull(node)
+
+    # time: O(log^3 n) amortized, plus O(hlogn) copying for a hull of h points
+    def insert(self, x, y):
+        x, y = float(x), float(y)
+        key = (x, y)
+        if key in self.counts:
+            self.counts[key] += 1
+            return
+        self.counts[key] = 1
+        leaf = HullNode(self.new_id(x, y))
+        if self.root is None:
+            self.root = leaf
+            return
+        old, path = self.search(key)
+        top = old.top
+        node = HullNode(None)
+        if key < (self.xs[top], self.ys[top]):
+            node.left, node.right = leaf, old
+        else:
+            node.left, node.right = old, leaf
+        self.pull(node)
+        self.replace(path[-1] if path else None, old, node)
+        self.rebalance(path)
+
+    # time: O(log^3 n) amortized, plus O(hlogn) copying for a hull of h points. Raises KeyError if
+    # the point isn't in the set
+    def remove(self, x, y):
+        key = (float(x), float(y))
+        count = self.counts[key]
+        if count > 1:
+            self.counts[key] = count - 1
+            return
+        del self.counts[key]
+        self.free.append(self.ids.pop(key))
+        leaf, path = self.search(key)
+        if not path:
+            self.root = None
+            return
+        parent = path.pop()
+        sibling = parent.right if parent.left is leaf else parent.left
+        self.replace(path[-1] if path else None, parent, sibling)
+        self.rebalance(path)
+
+    # time: O(h) space: O(h). Hull vertices as (x, y) pairs, clockwise from the leftmost point
+    def hull(self):
+        if self.root is None:
+            return []
+        return [(self.xs[p], self.ys[p]) for p in self.root.upper + self.root.lower[1:-1]]
+
+    # time: O(h) space: O(h). The hull's edges as pairs of points, each edge going clockwise
+    def edges(self):
+        hull = self.hull()
+        if len(hull) < 2:
+            return []
+        return list(zip(hull, hull[1:] + hull[:1]))
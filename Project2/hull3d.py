@@ -0,0 +1,198 @@
+import itertools
+import sys
+import time
+
+import numpy as np
+
+# Convex hull of a 3D point cloud, for the sphere distribution and collision meshes. Points come in
+# as an (n, 3) float64 array and the hull comes back as an (f, 3) array of triangles, each one three
+# rows into that array, counter-clockwise when seen from outside (so the right hand rule gives the
+# outward normal). This is QuickHull, which is incremental with a conflict list: every point not yet
+# inside the hull is kept with one face it is above, each step adds the farthest point above some
+# face, and only the points above the faces it removes get looked at again
+
+# Relative error bound on the floating point orientation determinant in 3D (Shewchuk's
+# o3derrboundA). A point is only above a face when its height clears this. Anything closer counts
+# as on the face, so the hull can leave out a point that is within rounding error of it
+ORIENT3D_ERROR_BOUND = 7.771561172376103e-16
+
+# Rows times faces per NumPy pass when sorting points onto faces, which keeps the arrays to a few MB
+HEIGHT_CELLS_PER_PASS = 2 ** 18
+
+
+# time: O(m) space: O(m). Planes of the triangles, an (m, 3) array of rows, as an (m, 9) array: a
+# corner, the normal (scaled by twice the area) and, for the error bound, the sizes of the terms that
+# make up each component of the normal
+def face_planes(points, triangles):
+    a = points[triangles[:, 0]]
+    u = points[triangles[:, 1]] - a
+    v = points[triangles[:, 2]] - a
+    terms = np.abs(np.stack((u[:, 1] * v[:, 2], u[:, 2] * v[:, 1], u[:, 2] * v[:, 0],
+                             u[:, 0] * v[:, 2], u[:, 0] * v[:, 1], u[:, 1] * v[:, 0]), axis=1))
+    return np.hstack((a, np.cross(u, v), terms[:, 0::2] + terms[:, 1::2]))
+
+
+# time: O(km) space: O(km) per pass. Heights of the given rows of points above each of the planes,
+# along their normals. Returns the heights and a mask of the ones that clear the error bound, both
+# (k, m)
+def face_heights(points, rows, planes):
+    ax, ay, az, nx, ny, nz, sx, sy, sz = planes.T
+    heights = np.empty((len(rows), len(planes)))
+    above = np.empty((len(rows), len(planes)), dtype=bool)
+    step = max(1, HEIGHT_CELLS_PER_PASS // max(1, len(planes)))
+    for lo in range(0, len(rows), step):
+        chunk = points[rows[lo:lo + step]]
+        dx = chunk[:, 0, None] - ax
+        dy = chunk[:, 1, None] - ay
+        dz = chunk[:, 2, None] - az
+        height = dx * nx + dy * ny + dz * nz
+        heights[lo:lo + step] = height
+        # most points end up below every face, so the error bound is only worked out for the rest
+        maybe = height > 0
+        r, f = np.nonzero(maybe)
+        err = ORIENT3D_ERROR_BOUND * (np.abs(dx[r, f]) * sx[f] + np.abs(dy[r, f]) * sy[f] + np.abs(dz[r, f]) * sz[f])
+        maybe[r, f] = height[r, f] > err
+        above[lo:lo + step] = maybe
+    return heights, above
+
+
+# time: O(1) space: O(1). face_heights' above test for one point and one plane, in plain floats
+def is_above(point, plane):
+    ax, ay, az, nx, ny, nz, sx, sy, sz = plane
+    dx, dy, dz = point[0] - ax, point[1] - ay, point[2] - az
+    return dx * nx + dy * ny + dz * nz > ORIENT3D_ERROR_BOUND * (abs(dx) * sx + abs(dy) * sy + abs(dz) * sz)
+
+
+# time: O(n) space: O(n). Four rows of points that make a tetrahedron with some volume: the two
+# furthest apart of the six axis extremes, the point furthest from the line through them and the
+# point furthest from the plane through all three. Raises ValueError when the points are all on one
+# plane, since they have no 3D hull then
+def initial_tetrahedron(points):
+    extremes = np.concatenate((points.argmin(axis=0), points.argmax(axis=0)))
+    spread = ((points[extremes, None, :] - points[None, extremes, :]) ** 2).sum(axis=2)
+    i, j = np.unravel_index(np.argmax(spread), spread.shape)
+    a, b = extremes[i], extremes[j]
+    c = np.argmax((np.cross(points - points[a], points[b] - points[a]) ** 2).sum(axis=1))
+    rows = np.arange(len(points))
+    heights, above = face_heights(points, rows, face_planes(points, np.array([[a, b, c]])))
+    below = face_heights(points, rows, face_planes(points, np.array([[a, c, b]])))[1]
+    if not (above.any() or below.any()):
+        raise ValueError('the points are all on one plane, so they have no 3D hull')
+    d = np.argmax(np.abs(heights[:, 0]))
+    return a, b, c, d
+
+
+# time: O(nlogn) expected for points spread through a volume, space: O(n).
+# Triangles of the convex hull of an (n, 3) array, as an (f, 3) array of rows, counter-clockwise from
+# outside. Points within rounding error of a face count as on it, so a face with more points on its
+# plane is split into triangles any which way, and those points are left out
+def hull3d_faces(points):
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 4:
+        raise ValueError('a 3D hull needs at least four points')
+    a, b, c, d = initial_tetrahedron(points)
+
+    # faces by id, their planes as tuples and the face on the left of each directed edge
+    faces = {}
+    planes = {}
+    edges = {}
+    # the points above each face, with their heights
+    outside = {}
+    face_ids = itertools.count()
+
+    def add_faces(triangles):
+        new_faces = [next(face_ids) for _ in triangles]
+        for f, triangle, plane in zip(new_faces, triangles, face_planes(points, np.array(triangles)).tolist()):
+            a, b, c = triangle
+            faces[f] = triangle
+            planes[f] = plane
+            edges[(a, b)] = edges[(b, c)] = edges[(c, a)] = f
+        return new_faces
+
+    # every point goes to the first of the new faces it is above, and the rest are inside for good
+    def assign(rows, new_faces):
+        if not len(rows):
+            return
+        heights, above = face_heights(points, rows, np.array([planes[f] for f in new_faces]))
+        owner = np.argmax(above, axis=1)
+        keep = above[np.arange(len(rows)), owner]
+        rows, owner, heights = rows[keep], owner[keep], heights[keep, owner[keep]]
+        for k in np.unique(owner).tolist():
+            mine = owner == k
+            outside[new_faces[k]] = (rows[mine], heights[mine])
+
+    # the tetrahedron, with each face turned so the fourth corner is behind it
+    tetrahedron = []
+    for face, other in (((a, b, c), d), ((a, d, b), c), ((b, d, c), a), ((a, c, d), b)):
+        if face_heights(points, np.array([other]), face_planes(points, np.array([face])))[0][0, 0] > 0:
+            face = face[::-1]
+        tetrahedron.append(face)
+    tetrahedron = add_faces(tetrahedron)
+    assign(np.setdiff1d(np.arange(len(points)), [a, b, c, d]), tetrahedron)
+
+    pending = list(tetrahedron)
+    while pending:
+        f = pending.pop()
+        if f not in outside:
+            continue
+        rows, heights = outside[f]
+        p = rows[np.argmax(heights)]
+        point = points[p].tolist()
+
+        # every face p is above, found by walking out from f across edges, and the edges around them
+        visible = {f}
+        stack = [f]
+        horizon = []
+        while stack:
+            u, v, w = faces[stack.pop()]
+            for edge in ((u, v), (v, w), (w, u)):
+                h = edges[edge[::-1]]
+                if h in visible:
+                    continue
+                if is_above(point, planes[h]):
+                    visible.add(h)
+                    stack.append(h)
+                else:
+                    horizon.append(edge)
+
+        # swap the faces p sees for a fan from p to the horizon, and share their points out again
+        orphans = [outside.pop(g)[0] for g in visible if g in outside]
+        for g in visible:
+            u, v, w = faces.pop(g)
+            del planes[g]
+            for edge in ((u, v), (v, w), (w, u)):
+                if edges.get(edge) == g:
+                    del edges[edge]
+        new_faces = add_faces([(u, v, p) for u, v in horizon])
+        rows = np.concatenate(orphans)
+        assign(rows[rows != p], new_faces)
+        pending += [g for g in new_faces if g in outside]
+
+    return np.array(list(faces.values()), dtype=np.int64).reshape(-1, 3)
+
+
+# Times hull3d_faces on sphere points, n from 10^3 to 10^6 by default, with a fixed seed for each n.
+# Prints the time, the hull's size and the time over nlogn
+def benchmark(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), seed=312, trials=3):
+    from point_workloads import sample_points
+    for n in sizes:
+        points = sample_points(n, 'sphere', seed)
+        times = []
+        for _ in range(trials):
+            t1 = time.time()
+            faces = hull3d_faces(points)
+            times.append(time.time() - t1)
+        mean = sum(times) / trials
+        print('When n = {} [{}]  {} faces, {} vertices  k = {:.3g}'.format(
+            n, ', '.join('{:.3f}'.format(t) for t in times), len(faces), len(np.unique(faces)), mean / (n * np.log2(n))))
+
+
+if __name__ == '__main__':
+    benchmark([int(n) for n in sys.argv[1:]] or (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6))
+
+
+# Empirical Data: 3D Hull Elapsed Times, sphere points (seed 312)     k = mean measured time/nlogn
+# When n = 1000 [0.058, 0.030, 0.032]        262 faces, 133 vertices       k = 0.0000040
+# When n = 10000 [0.162, 0.141, 0.137]       874 faces, 439 vertices       k = 0.0000011
+# When n = 100000 [0.852, 1.055, 1.056]      2818 faces, 1411 vertices     k = 0.00000059
+# When n = 1000000 [6.061, 5.825, 6.004]     8974 faces, 4489 vertices     k = 0.00000030
@@ -0,0 +1,247 @@
+import numpy as np
+
+# Other ways to find the same hull as hull_engine's divide and conquer. Everything takes an (n, 2)
+# float64 array and returns the row indices of the hull vertices in clockwise order, starting from
+# the leftmost point, with duplicates and points in the middle of an edge left out. The floating
+# point work only ever narrows things down to candidate vertices, and chain_hull's exact orientation
+# test has the final say, so every algorithm returns exactly the same hull
+from hull_engine import *
+from parallel_hull import parallel_hull_indices
+
+# Chan's algorithm guesses the hull size as m = 2^(2^t) and starts at this t. Smaller guesses mean
+# thousands of tiny groups, which costs more in Python than it saves
+CHAN_START_ROUND = 3
+
+# A gift wrapping step costs about as much as merging this many hull vertices. Once a round's wrap
+# has taken more steps than the group hulls have vertices / CHAN_STEP_COST, merging the group hulls
+# is cheaper than carrying on, so that is what happens instead
+CHAN_STEP_COST = 512
+
+# Points in the sample choose_algorithm looks at
+AUTO_SAMPLE_SIZE = 2000
+
+# choose_algorithm picks QuickHull when no more than this fraction of the sample is on the sample's
+# hull. QuickHull does a NumPy pass per hull vertex, so it falls behind divide and conquer once the
+# hull is a sizable fraction of the points (points on a circle, say)
+AUTO_QUICKHULL_HULL_FRACTION = 0.05
+
+# and no more than this fraction of the sample survives the octagon cull
+AUTO_QUICKHULL_SURVIVORS = 0.5
+
+# Below this many points the sample would be most of the input, so just run divide and conquer
+AUTO_MIN_POINTS = 10000
+
+
+# time: O(nlogn) space: O(n). Exact hull of the given rows of points. The other algorithms use this
+# to turn their candidate vertices into the final hull
+def candidate_hull(points, candidates):
+    candidates = np.unique(candidates)
+    sub = points[candidates]
+    order = sort_order(sub)
+    xs = sub[order, 0].tolist()
+    ys = sub[order, 1].tolist()
+    return candidates[order[chain_hull(xs, ys, range(len(order)))]]
+
+
+# time: O(nlogn) space: O(n). Andrew's monotone chain over every point
+def monotone_chain_hull(points):
+    points = np.asarray(points, dtype=np.float64)
+    return candidate_hull(points, np.arange(len(points)))
+
+
+# time: O(nh) worst case, O(nlogh) expected space: O(n). QuickHull on whatever survives the octagon
+# cull. Each edge a -> b of the clockwise hull has the outside on its left, so the farthest point to
+# the left splits it into two new edges. Points too close to an edge to be sure which side they are
+# on become candidates instead of being dropped
+def quickhull(points):
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3:
+        return candidate_hull(points, np.arange(len(points)))
+    keep = np.flatnonzero(octagon_cull(points))
+    xs = points[keep, 0]
+    ys = points[keep, 1]
+    left = np.lexsort((ys, xs))[0]
+    right = np.lexsort((-ys, xs))[-1]
+
+    candidates = [np.array([left, right])]
+    everything = np.arange(len(keep))
+    # explicit stack of (a, b, points that might be left of a -> b)
+    stack = [(left, right, everything), (right, left, everything)]
+    while stack:
+        a, b, rest = stack.pop()
+        det_left = (xs[b] - xs[a]) * (ys[rest] - ys[a])
+        det_right = (ys[b] - ys[a]) * (xs[rest] - xs[a])
+        det = det_left - det_right
+        err = ORIENTATION_ERROR_BOUND * (np.abs(det_left) + np.abs(det_right))
+        # written so a NaN from an overflow makes a candidate too
+        candidates.append(rest[~(np.abs(det) > err)])
+        outside = det > err
+        if outside.any():
+            rest = rest[outside]
+            far = rest[np.argmax(det[outside])]
+            stack.append((far, b, rest))
+            stack.append((a, far, rest))
+    return keep[candidate_hull(points[keep], np.concatenate(candidates))]
+
+
+# time: O(k * g * logm) space: O(gm), where k is the number of steps, g the number of chains and m
+# the longest one. Gift wraps across chains, a (g, m) array of positions holding the upper hull of g
+# groups of points, left to right, with every group entirely to the right of the one before it.
+# Each step binary searches every chain to the right for its tangent from the current point, and
+# moves to the candidate with nothing to the left of it. Gives up and returns None after limit
+# steps, otherwise returns the positions it went through and the number of steps taken
+def wrap_chains(xs, ys, chains, lengths, limit):
+    groups = len(lengths)
+    g = 0
+    k = 0
+    wrapped = [chains[0, 0]]
+    steps = 0
+    while g < groups - 1 or k < lengths[g] - 1:
+        steps += 1
+        if steps > limit:
+            return None, steps
+        p = chains[g, k]
+
+        # the tangent from p to an upper hull on its right is the last point where the chain still
+        # turns left of (or runs straight along) the line from p
+        rows = np.arange(g + 1, groups)
+        lo = np.zeros(len(rows), dtype=np.int64)
+        hi = lengths[g + 1:] - 1
+        active = np.flatnonzero(lo < hi)
+        while len(active):
+            mid = (lo[active] + hi[active]) // 2
+            turn = orientation_signs(xs, ys, p, chains[rows[active], mid], chains[rows[active], mid + 1]) >= 0
+            lo[active[turn]] = mid[turn] + 1
+            hi[active[~turn]] = mid[~turn]
+            active = active[lo[active] < hi[active]]
+
+        # p's own chain only offers the next point along it
+        if k + 1 < lengths[g]:
+            rows = np.append(g, rows)
+            lo = np.append(k + 1, lo)
+        candidates = chains[rows, lo]
+
+        # start from the steepest candidate by float slope, and swing further counter-clockwise
+        # while the exact test finds anything to the left
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (ys[candidates] - ys[p]) / (xs[candidates] - xs[p])
+        best = np.argmax(slope)
+        while True:
+            others = np.flatnonzero(candidates != candidates[best])
+            signs = np.zeros(len(candidates), dtype=np.int64)
+            signs[others] = orientation_signs(xs, ys, p, candidates[best], candidates[others])
+            left = np.flatnonzero(signs > 0)
+            if not len(left):
+                break
+            best = left[np.argmax(slope[left])]
+        # of the candidates on the line from p, the farthest one is the next vertex
+        line = np.flatnonzero(signs == 0)
+        best = line[np.lexsort((ys[candidates[line]], xs[candidates[line]]))[-1]]
+        g = rows[best]
+        k = lo[best]
+        wrapped.append(candidates[best])
+    return wrapped, steps
+
+
+# Lays the given chains out as a (g, m) array of positions, padded with -1, and their lengths
+def pad_chains(chains):
+    lengths = np.array([len(chain) for chain in chains], dtype=np.int64)
+    padded = np.full((len(chains), lengths.max()), -1, dtype=np.int64)
+    for row, chain in enumerate(chains):
+        padded[row, :len(chain)] = chain
+    return padded, lengths
+
+
+# time: O(nlogh) hull work on top of the sort, space: O(n).
+# Chan's algorithm. Guess the hull has at most m points, find the hulls of groups of m sorted points
+# with the divide and conquer merge, then gift wrap around the group hulls for at most m steps. If
+# that doesn't close the hull, square m and go again, unless merging the group hulls would now be
+# cheaper than wrapping (see CHAN_STEP_COST). Since the groups are runs of sorted points,
+# they sit side by side, so the wrap goes left to right along their upper hulls and then back along
+# their lower hulls (which are upper hulls once the points are turned half way round). The leaf
+# hulls are shared by every round
+def chan_hull(points):
+    points = np.asarray(points, dtype=np.float64)
+    order = sort_order(points)
+    n = len(order)
+    if n < 3:
+        return order
+    sorted_points = points[order]
+    sx = sorted_points[:, 0]
+    sy = sorted_points[:, 1]
+    xs, ys, hull, leaves = leaf_hulls(sorted_points)
+    t = CHAN_START_ROUND
+    while True:
+        m = min(2 ** (2 ** t), n)
+        per_group = max(1, m // LEAF_SIZE)
+        # merging writes over the leaves, so each round works on a copy
+        buffer = list(hull)
+        groups = [convex_hull_solver(xs, ys, buffer, leaves[g:g + per_group])
+                  for g in range(0, len(leaves), per_group)]
+        if len(groups) == 1:
+            lo, size, end = groups[0]
+            return order[buffer[lo:lo + size]]
+
+        upper = pad_chains([buffer[lo:lo + end + 1] for lo, size, end in groups])
+        lower = pad_chains([buffer[lo + end:lo + size] + buffer[lo:lo + min(end, 1)] for lo, size, end in groups[::-1]])
+        limit = min(m, sum(size for lo, size, end in groups) // CHAN_STEP_COST)
+        upper_wrap, steps = wrap_chains(sx, sy, *upper, limit)
+        if upper_wrap is not None:
+            lower_wrap, steps = wrap_chains(-sx, -sy, *lower, limit - steps)
+            if lower_wrap is not None:
+                return order[upper_wrap + lower_wrap[1:-1]]
+        if limit < m:
+            lo, size, end = convex_hull_solver(xs, ys, buffer, groups)
+            return order[buffer[lo:lo + size]]
+        t += 1
+
+
+# time: O(nlogn) space: O(n). The divide and conquer merge from hull_engine
+def divide_and_conquer_hull(points):
+    return hull_indices(points)
+
+
+HULL_ALGORITHMS = {
+    'divide': divide_and_conquer_hull,
+    'monotone': monotone_chain_hull,
+    'quickhull': quickhull,
+    'chan': chan_hull,
+    'parallel': parallel_hull_indices,
+}
+
+
+# time: O(s log s) for a sample of s points, space: O(n).
+# Picks an algorithm for these points. A random sample's hull size estimates how big the real hull
+# is, and the octagon cull on the sample says how many points QuickHull would have to look at.
+# Monotone chain and Chan's algorithm never win here: they do all their work one point (or one
+# wrapping step) at a time in Python, where the other two hand most of theirs to NumPy. The
+# parallel engine is left for callers that know they have the cores to spare
+def choose_algorithm(points):
+    n = len(points)
+    if n < AUTO_MIN_POINTS:
+        return 'divide'
+    sample = points[np.random.default_rng().choice(n, AUTO_SAMPLE_SIZE, replace=False)]
+    hull_fraction = len(divide_and_conquer_hull(sample)) / AUTO_SAMPLE_SIZE
+    survivors = octagon_cull(sample).mean()
+    if hull_fraction <= AUTO_QUICKHULL_HULL_FRACTION and survivors <= AUTO_QUICKHULL_SURVIVORS:
+        return 'quickhull'
+    return 'divide'
+
+
+# Finds the hull of points with the named algorithm, or the one choose_algorithm picks for 'auto'.
+# Returns the row indices of the hull and the name of the algorithm that ran
+def solve_hull(points, algorithm='auto'):
+    points = np.asarray(points, dtype=np.float64)
+    if algorithm == 'auto':
+        algorithm = choose_algorithm(points)
+    if algorithm not in HULL_ALGORITHMS:
+        raise ValueError('unknown hull algorithm: {}'.format(algorithm))
+    return HULL_ALGORITHMS[algorithm](points), algorithm
+
+
+# Runs every algorithm on points and returns the names of the ones whose hull doesn't match the
+# divide and conquer result. An empty list means they all agree
+def cross_check(points):
+    points = np.asarray(points, dtype=np.float64)
+    expected = divide_and_conquer_hull(points).tolist()
+    return [name for name, algorithm in HULL_ALGORITHMS.items() if algorithm(points).tolist() != expected]
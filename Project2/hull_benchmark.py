@@ -0,0 +1,198 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+# Timings of the hull engines without the GUI, so nothing here needs a QApplication. Every
+# distribution in point_workloads is generated at every size with a fixed seed, so two runs time the
+# same points, and each engine is timed on them a few times over. Engines that sort and then merge
+# have the two phases timed on their own, the rest only report a total. The rows and a least squares
+# fit of time = k * nlogn per engine and distribution go to CSV and JSON, which can be kept next to
+# a release and compared with the next one
+from hull_algorithms import *
+from point_workloads import DISTRIBUTIONS, generate_points
+
+# n from 10 to 10^7, the sizes of the tables at the bottom of convex_hull.py and then some
+BENCHMARK_SIZES = (10, 100, 1000, 10 ** 4, 10 ** 5, 5 * 10 ** 5, 10 ** 6, 10 ** 7)
+
+# The points for size n come from the seed (BENCHMARK_SEED, n)
+BENCHMARK_SEED = 312
+
+# The engines that do their work one point at a time in Python take about 40 seconds a trial at
+# 10^7 points, so by default they stop here
+ENGINE_MAX_POINTS = {
+    'monotone': 10 ** 6,
+    'chan': 10 ** 6,
+}
+
+# Only sizes from here up go into the nlogn fit. Below it a run is mostly the fixed cost of the NumPy
+# calls, which would swamp the relative error of the fit
+FIT_MIN_POINTS = 1000
+
+# Columns of the CSV output, one row per trial. sort and merge are empty for engines that don't
+# split into the two phases
+CSV_FIELDS = ('engine', 'distribution', 'n', 'seed', 'trial', 'sort', 'merge', 'total', 'hull_size')
+
+
+# time: O(nlogn). hull_indices with the cull and sort timed apart from the merge. Returns the hull,
+# the sort time and the merge time
+def divide_phases(points):
+    t0 = time.perf_counter()
+    keep = np.flatnonzero(octagon_cull(points))
+    order = keep[sort_order(points[keep])]
+    sorted_points = points[order]
+    t1 = time.perf_counter()
+    hull = order[hull_of_sorted(sorted_points)]
+    t2 = time.perf_counter()
+    return hull, t1 - t0, t2 - t1
+
+
+# time: O(nlogn). monotone_chain_hull with the sort timed apart from the chain
+def monotone_phases(points):
+    t0 = time.perf_counter()
+    order = sort_order(points)
+    xs = points[order, 0].tolist()
+    ys = points[order, 1].tolist()
+    t1 = time.perf_counter()
+    hull = order[chain_hull(xs, ys, range(len(order)))]
+    t2 = time.perf_counter()
+    return hull, t1 - t0, t2 - t1
+
+
+# Engines with their phases split out. Every other engine in HULL_ALGORITHMS sorts (or doesn't) as
+# part of the rest of its work: QuickHull only sorts its candidates at the end, Chan's algorithm
+# sorts each group on its own and the parallel engine sorts and merges in its workers
+ENGINE_PHASES = {
+    'divide': divide_phases,
+    'monotone': monotone_phases,
+}
+
+
+# time: O(nlogn) for most engines. Runs an engine once on points. Returns the hull and the sort,
+# merge and total times, with sort and merge None when the engine has no phases
+def time_engine(engine, points):
+    if engine in ENGINE_PHASES:
+        hull, sort_time, merge_time = ENGINE_PHASES[engine](points)
+        return hull, sort_time, merge_time, sort_time + merge_time
+    t0 = time.perf_counter()
+    hull = HULL_ALGORITHMS[engine](points)
+    return hull, None, None, time.perf_counter() - t0
+
+
+# Runs every engine on every distribution at every size, trials times each. Returns one dict per
+# trial with the CSV_FIELDS as keys. The points are made before the clock starts. Raises ValueError
+# for an unknown engine or distribution
+def run_benchmark(engines=None, distributions=None, sizes=BENCHMARK_SIZES, trials=3, seed=BENCHMARK_SEED,
+                  max_points=ENGINE_MAX_POINTS, log=None):
+    engines = list(HULL_ALGORITHMS) if engines is None else engines
+    distributions = list(DISTRIBUTIONS) if distributions is None else distributions
+    for engine in engines:
+        if engine not in HULL_ALGORITHMS:
+            raise ValueError('unknown hull algorithm: {}'.format(engine))
+    for distribution in distributions:
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError('unknown point distribution: {}'.format(distribution))
+
+    rows = []
+    for distribution in distributions:
+        for n in sizes:
+            points = generate_points(n, distribution, (seed, n))
+            for engine in engines:
+                if n > max_points.get(engine, n):
+                    continue
+                for trial in range(trials):
+                    hull, sort_time, merge_time, total = time_engine(engine, points)
+                    rows.append({'engine': engine, 'distribution': distribution, 'n': n, 'seed': seed, 'trial': trial,
+                                 'sort': sort_time, 'merge': merge_time, 'total': total, 'hull_size': len(hull)})
+                if log is not None:
+                    times = [row['total'] for row in rows[-trials:]]
+                    log('{} {} n = {} [{}]'.format(engine, distribution, n, ', '.join('{:.4f}'.format(t) for t in times)))
+    return rows
+
+
+# time: O(r) for r rows. Least squares k for time = k * nlog2(n), by engine and distribution, for the
+# total and for each phase the engine has, over the sizes from FIT_MIN_POINTS up. Returns
+# a list of dicts with the engine, distribution, the k of each column and the biggest relative
+# distance of a mean time from its fit, which says how well nlogn describes the engine
+def fit_constants(rows):
+    groups = {}
+    for row in rows:
+        if row['n'] >= FIT_MIN_POINTS:
+            groups.setdefault((row['engine'], row['distribution']), []).append(row)
+
+    fits = []
+    for (engine, distribution), group in groups.items():
+        fit = {'engine': engine, 'distribution': distribution}
+        sizes = np.unique([row['n'] for row in group])
+        nlogn = sizes * np.log2(sizes)
+        for column in ('sort', 'merge', 'total'):
+            if group[0][column] is None:
+                fit[column + '_k'] = None
+                continue
+            means = np.array([np.mean([row[column] for row in group if row['n'] == n]) for n in sizes])
+            k = float(means @ nlogn / (nlogn @ nlogn))
+            fit[column + '_k'] = k
+            if column == 'total':
+                fit['worst_fit'] = float(np.max(np.abs(means - k * nlogn) / np.maximum(means, 1e-9)))
+        fits.append(fit)
+    return fits
+
+
+# Writes the rows to path as CSV, with the missing phases as empty cells
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: '' if value is None else value for key, value in row.items()})
+
+
+# Writes the rows and fits to path as JSON, along with what they were run on
+def write_json(rows, fits, path):
+    machine = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+               'cpus': os.cpu_count()}
+    with open(path, 'w') as f:
+        json.dump({'machine': machine, 'rows': rows, 'fits': fits}, f, indent=1)
+
+
+# The fits as lines like the tables in convex_hull.py
+def format_fits(fits):
+    lines = []
+    for fit in fits:
+        ks = ', '.join('{} k = {:.3g}'.format(column, fit[column + '_k'])
+                       for column in ('sort', 'merge', 'total') if fit[column + '_k'] is not None)
+        lines.append('{} {}: {} (worst fit {:.0%})'.format(fit['engine'], fit['distribution'], ks, fit['worst_fit']))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the hull engines without the GUI.')
+    parser.add_argument('--engines', nargs='+', choices=list(HULL_ALGORITHMS), help='engines to time (default: all)')
+    parser.add_argument('--distributions', nargs='+', choices=list(DISTRIBUTIONS),
+                        help='point distributions (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=BENCHMARK_SIZES, help='numbers of points')
+    parser.add_argument('--trials', type=int, default=3, help='runs of each engine on each point set')
+    parser.add_argument('--seed', type=int, default=BENCHMARK_SEED, help='seed the point sets are made from')
+    parser.add_argument('--all-sizes', action='store_true',
+                        help='run the slow engines at every size too, instead of stopping them at 10^6 points')
+    parser.add_argument('--csv', help='file to write the rows to as CSV')
+    parser.add_argument('--json', help='file to write the rows and fits to as JSON')
+    args = parser.parse_args(argv)
+
+    rows = run_benchmark(args.engines, args.distributions, args.sizes, args.trials, args.seed,
+                         {} if args.all_sizes else ENGINE_MAX_POINTS, log=print)
+    fits = fit_constants(rows)
+    for line in format_fits(fits):
+        print(line)
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.json:
+        write_json(rows, fits, args.json)
+
+
+if __name__ == '__main__':
+    main()
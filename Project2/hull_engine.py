@@ -0,0 +1,390 @@
+import numpy as np
+
+# Array-backed divide and conquer convex hull. Points come in as an (n, 2) float64 array and hulls
+# come back as row indices into that array, in clockwise order starting from the leftmost point
+# (lowest y breaks ties). Hulls only keep strict corners: duplicate points and points in the middle
+# of a hull edge are left out. Nothing in here touches Qt, so it can run headless
+
+# Relative error bound on the floating point orientation determinant (Shewchuk's ccwerrboundA).
+# Whenever the determinant is bigger than this, its sign is right and the exact version is skipped
+ORIENTATION_ERROR_BOUND = 3.3306690738754716e-16
+
+# Points per leaf of the recursion. Leaf hulls are found for every block at once with NumPy
+LEAF_SIZE = 16
+
+# Blocks per NumPy pass in block_hulls, which keeps the slope arrays to a few MB
+BLOCKS_PER_PASS = 4096
+
+# block_hulls only trusts a floating point slope comparison when the two slopes are further apart
+# than this (relative to their size). Blocks with anything closer get redone by chain_hull
+SLOPE_TOLERANCE = 1e-12
+
+
+# time: O(nlogn) space: O(n). Row order that sorts the points by x (ties broken by y). Only the first
+# copy of a duplicate point is kept, so the hull never has to deal with zero length edges
+def sort_order(points):
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    xs = points[:, 0][order]
+    ys = points[:, 1][order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+    return order[keep]
+
+
+# time: O(n) space: O(n). Akl-Toussaint heuristic: the points that are extreme in x, y, x + y and
+# x - y make a convex octagon, and nothing strictly inside it can be on the hull. Returns a mask of
+# the points that survive. A point is only culled when its orientation against every octagon edge
+# clears the float error bound, so this never drops a hull vertex
+def octagon_cull(points):
+    xs = points[:, 0]
+    ys = points[:, 1]
+    # counter-clockwise: left, bottom left, bottom, bottom right, right, top right, top, top left
+    corners = [np.argmin(xs), np.argmin(xs + ys), np.argmin(ys), np.argmax(xs - ys),
+               np.argmax(xs), np.argmax(xs + ys), np.argmax(ys), np.argmax(ys - xs)]
+    octagon = []
+    for corner in corners:
+        corner_xy = points[corner].tolist()
+        if not octagon or corner_xy != octagon[-1]:
+            octagon.append(corner_xy)
+    if len(octagon) > 1 and octagon[0] == octagon[-1]:
+        octagon.pop()
+    if len(octagon) < 3:
+        return np.ones(len(points), dtype=bool)
+
+    inside = np.ones(len(points), dtype=bool)
+    for k in range(len(octagon)):
+        (ax, ay), (bx, by) = octagon[k], octagon[(k + 1) % len(octagon)]
+        det_left = (bx - ax) * (ys - ay)
+        det_right = (by - ay) * (xs - ax)
+        det = det_left - det_right
+        # a determinant that overflowed says nothing, so that point stays
+        inside &= np.isfinite(det) & (det > ORIENTATION_ERROR_BOUND * (np.abs(det_left) + np.abs(det_right)))
+    return ~inside
+
+
+# time: O(1) space: O(1). Positive if c is to the left of the line a -> b (a counter-clockwise turn),
+# negative if it is to the right and zero if the three points are collinear. The float determinant
+# is used when it is big enough to trust, otherwise the sign comes from exact integer arithmetic
+def orientation(xs, ys, a, b, c):
+    det_left = (xs[b] - xs[a]) * (ys[c] - ys[a])
+    det_right = (ys[b] - ys[a]) * (xs[c] - xs[a])
+    det = det_left - det_right
+    if abs(det) > ORIENTATION_ERROR_BOUND * (abs(det_left) + abs(det_right)):
+        return det
+    return exact_orientation(xs, ys, a, b, c)
+
+
+# time: O(1) space: O(1), but a lot slower than the float version. Returns -1, 0 or 1.
+# Every float is an integer over a power of two, so scaling the six coordinates up to the largest of
+# those denominators turns the determinant into plain integer arithmetic
+def exact_orientation(xs, ys, a, b, c):
+    ratios = [value.as_integer_ratio() for value in (xs[a], ys[a], xs[b], ys[b], xs[c], ys[c])]
+    scale = max(denominator for numerator, denominator in ratios)
+    ax, ay, bx, by, cx, cy = [numerator * (scale // denominator) for numerator, denominator in ratios]
+    det = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (det > 0) - (det < 0)
+
+
+# time: O(n) space: O(n). orientation() for whole arrays of positions a, b and c at once (any of
+# them can be a single position). Returns an array of -1, 0 and 1, only going to exact arithmetic
+# for the entries the float error bound can't vouch for
+def orientation_signs(xs, ys, a, b, c):
+    det_left = (xs[b] - xs[a]) * (ys[c] - ys[a])
+    det_right = (ys[b] - ys[a]) * (xs[c] - xs[a])
+    det = det_left - det_right
+    signs = np.sign(det).astype(np.int64)
+    # written so a NaN from an overflow counts as unsure
+    unsure = np.flatnonzero(~(np.abs(det) > ORIENTATION_ERROR_BOUND * (np.abs(det_left) + np.abs(det_right))))
+    if len(unsure):
+        a, b, c = np.broadcast_arrays(a, b, c)
+        for i in unsure.tolist():
+            signs[i] = exact_orientation(xs, ys, a[i], b[i], c[i])
+    return signs
+
+
+# time: O(n) space: O(n). Andrew's monotone chain over positions, a sorted sequence of positions into
+# xs and ys, using the robust orientation test. Handles whatever block_hulls can't decide (vertical
+# lines, collinear points and the leftover points that don't fill a block), and cleans up the
+# candidate vertices the other hull algorithms find
+def chain_hull(xs, ys, positions):
+    # clockwise means every turn along the hull is to the right, so drop anything that isn't
+    upper = []
+    for p in positions:
+        while len(upper) >= 2 and orientation(xs, ys, upper[-2], upper[-1], p) >= 0:
+            upper.pop()
+        upper.append(p)
+    lower = []
+    for p in reversed(positions):
+        while len(lower) >= 2 and orientation(xs, ys, lower[-2], lower[-1], p) >= 0:
+            lower.pop()
+        lower.append(p)
+    return upper + lower[1:-1]
+
+
+# time: O(nB) space: O(nB) where B is the block size.
+# Hulls of every block of B consecutive sorted points, found all at once. A point is on the upper
+# hull of its block when every point before it reaches it with a steeper slope than it reaches every
+# point after it (and the other way around for the lower hull). Blocks where one of those comparisons
+# is too close to call in floating point, or where two points share an x, are left for chain_hull
+# and returned as a list of block numbers. Every other block k gets its clockwise hull written to
+# hull[k*B:k*B + sizes[k]], as positions in the sorted order, and ends[k] is the index of its
+# rightmost point
+def block_hulls(xs, ys, B, hull, sizes, ends):
+    blocks = len(xs) // B
+    unsure_blocks = []
+    for first in range(0, blocks, BLOCKS_PER_PASS):
+        last = min(first + BLOCKS_PER_PASS, blocks)
+        bx = xs[first * B:last * B].reshape(-1, B)
+        by = ys[first * B:last * B].reshape(-1, B)
+
+        # slope[k, a, i] is the slope from point a to point i of block k
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (by[:, None, :] - by[:, :, None]) / (bx[:, None, :] - bx[:, :, None])
+        # only pairs with a before i count. Flipping the sign lets one masked array serve both the
+        # minimum and the maximum
+        before = np.tri(B, k=-1, dtype=bool).T
+        high = np.where(before, slope, np.inf)
+        low = np.where(before, -slope, np.inf)
+        into_min = high.min(axis=1)
+        into_max = -low.min(axis=1)
+        out_min = high.min(axis=2)
+        out_max = -low.min(axis=2)
+
+        upper = into_min > out_max
+        lower = into_max < out_min
+        upper[:, [0, -1]] = True
+        lower[:, [0, -1]] = False
+
+        # lay each block out clockwise (upper hull left to right, then lower hull right to left)
+        keep = np.hstack((upper, lower[:, ::-1]))
+
+        # a block is only trusted if every interior decision was clear of rounding error
+        with np.errstate(invalid='ignore'):
+            upper_close = np.abs(into_min - out_max) <= SLOPE_TOLERANCE * (np.abs(into_min) + np.abs(out_max))
+            lower_close = np.abs(out_min - into_max) <= SLOPE_TOLERANCE * (np.abs(out_min) + np.abs(into_max))
+        close = (upper_close | lower_close)[:, 1:-1]
+        # as are blocks where a difference or a slope overflowed
+        overflow = ~(np.isfinite(np.diff(bx, axis=1)) & np.isfinite(np.diff(by, axis=1))).all(axis=1) | \
+            (before & ~np.isfinite(slope)).any(axis=(1, 2))
+        unsure = close.any(axis=1) | (np.diff(bx, axis=1) == 0).any(axis=1) | (keep.sum(axis=1) > B) | overflow
+        keep[unsure] = False
+
+        # each kept position goes to its block's stretch of hull, in the order it was kept. The
+        # rightmost point closes the upper hull, so its index is the upper hull's size less one
+        positions = np.arange(first * B, last * B).reshape(-1, B)
+        rows = np.nonzero(keep)[0]
+        slots = np.cumsum(keep, axis=1)[keep] - 1
+        hull[(first + rows) * B + slots] = np.hstack((positions, positions[:, ::-1]))[keep]
+        sizes[first:last] = keep.sum(axis=1)
+        ends[first:last] = upper.sum(axis=1) - 1
+        unsure_blocks += (first + np.flatnonzero(unsure)).tolist()
+    return unsure_blocks
+
+
+# time: O(nlogn) space: O(logn) on top of the hull buffer.
+# Each leaf is a (lo, size, end) triple: the hull of one block of sorted points sits in
+# hull[lo:lo + size], and hull[lo + end] is its rightmost point. Merging two neighbouring hulls
+# writes the result back over the left one, so the hull of any run of blocks always fits in the
+# buffer space of those blocks and nothing else gets allocated. An explicit stack stands in for the
+# recursion: each leaf is pushed, and the top two entries are merged whenever they cover the same
+# number of leaves, which gives the same balanced merge tree as splitting in halves.
+# Returns the (lo, size, end) of the final hull
+def convex_hull_solver(xs, ys, hull, leaves):
+    stack = []
+    for leaf in leaves:
+        count = 1
+        while stack and stack[-1][1] == count:
+            left, left_count = stack.pop()
+            leaf = merge_hull(xs, ys, hull, left, leaf)
+            count += left_count
+        stack.append((leaf, count))
+
+    # whatever is left has fewer leaves on the right, so finish from the top of the stack down
+    merged = stack.pop()[0]
+    while stack:
+        merged = merge_hull(xs, ys, hull, stack.pop()[0], merged)
+    return merged
+
+
+# time: O(n) space: O(n). Splits the sorted points into leaves: full blocks of LEAF_SIZE points
+# found with block_hulls, and whatever is left over as one more chain_hull leaf. Returns the
+# coordinates as lists, the hull buffer and the leaves in it
+def leaf_hulls(sorted_points):
+    xs = sorted_points[:, 0]
+    ys = sorted_points[:, 1]
+    n = len(xs)
+    blocks = n // LEAF_SIZE
+    hull = np.zeros(n, dtype=np.int64)
+    sizes = np.zeros(blocks, dtype=np.int64)
+    ends = np.zeros(blocks, dtype=np.int64)
+    unsure_blocks = block_hulls(xs, ys, LEAF_SIZE, hull, sizes, ends)
+    leaves = list(zip(range(0, blocks * LEAF_SIZE, LEAF_SIZE), sizes.tolist(), ends.tolist()))
+    hull = hull.tolist()
+    x_list = xs.tolist()
+    y_list = ys.tolist()
+
+    for k in unsure_blocks:
+        lo = k * LEAF_SIZE
+        block = chain_hull(x_list, y_list, range(lo, lo + LEAF_SIZE))
+        hull[lo:lo + len(block)] = block
+        leaves[k] = (lo, len(block), block.index(lo + LEAF_SIZE - 1))
+    lo = blocks * LEAF_SIZE
+    if lo < n:
+        tail = chain_hull(x_list, y_list, range(lo, n))
+        hull[lo:lo + len(tail)] = tail
+        leaves.append((lo, len(tail), tail.index(n - 1)))
+    return x_list, y_list, hull, leaves
+
+
+# time: O(n) space: O(n). Merges the left and right hulls, both (lo, size, end) triples, and writes
+# the result over the left one. Returns the merged triple
+def merge_hull(xs, ys, hull, left, right):
+    lo, n_left = left[:2]
+    mid, n_right, right_end = right
+    top_left, top_right = find_top_tan(xs, ys, hull, left, right)
+    bottom_left, bottom_right = find_bottom_tan(xs, ys, hull, left, right)
+
+    # walk clockwise: left hull up to the top tangent (already in place), right hull from the top
+    # tangent round to the bottom tangent, then the rest of the left hull back to its leftmost point.
+    # The last two are read out before anything is written, since they can overlap where they end up
+    if top_right <= bottom_right:
+        tail = hull[mid + top_right:mid + bottom_right + 1]
+    else:
+        tail = hull[mid + top_right:mid + n_right] + hull[mid:mid + bottom_right + 1]
+    if bottom_left != 0:
+        tail += hull[lo + bottom_left:lo + n_left]
+    start = lo + top_left + 1
+    hull[start:start + len(tail)] = tail
+    # the right hull's rightmost point is the merged hull's, and the top tangent never passes it
+    return lo, top_left + 1 + len(tail), top_left + 1 + right_end - top_right
+
+
+# time: O(n) space: O(1). Returns the indexes of the upper tangent within the left and right hulls.
+# The tangent only touches the upper chains, left[0..end] and right[0..end], so each side walks
+# one way and the loop always ends. A point on the tangent line counts as above it, which leaves
+# collinear points out of the new edge. This loop is where the engine spends its time, so the float
+# half of orientation() is written out inline. Squaring both sides of the error bound test saves
+# the abs() calls: when det_left and det_right have opposite signs the sign of det is never in doubt.
+# The test is written as not greater so a NaN from an overflow goes to the exact path too
+def find_top_tan(xs, ys, hull, left, right):
+    lo, n_left, i = left
+    mid, n_right, j_end = right
+    bound = ORIENTATION_ERROR_BOUND
+    j = 0
+    changed = True
+    while changed:
+        changed = False
+        b = hull[mid + j]
+        bx = xs[b]
+        by = ys[b]
+        # move counter-clockwise on the left hull while the next point is on or above the tangent
+        while i > 0:
+            a = hull[lo + i]
+            ax = xs[a]
+            ay = ys[a]
+            c = hull[lo + i - 1]
+            det_left = (bx - ax) * (ys[c] - ay)
+            det_right = (by - ay) * (xs[c] - ax)
+            det = det_left - det_right
+            err = bound * (det_left + det_right)
+            if not (det * det > err * err):
+                det = exact_orientation(xs, ys, a, b, c)
+            if det < 0:
+                break
+            i -= 1
+            changed = True
+        a = hull[lo + i]
+        ax = xs[a]
+        ay = ys[a]
+        # move clockwise on the right hull while the next point is on or above the tangent
+        while j < j_end:
+            b = hull[mid + j]
+            bx = xs[b]
+            by = ys[b]
+            c = hull[mid + j + 1]
+            det_left = (bx - ax) * (ys[c] - ay)
+            det_right = (by - ay) * (xs[c] - ax)
+            det = det_left - det_right
+            err = bound * (det_left + det_right)
+            if not (det * det > err * err):
+                det = exact_orientation(xs, ys, a, b, c)
+            if det < 0:
+                break
+            j += 1
+            changed = True
+    return i, j
+
+
+# time: O(n) space: O(1). Returns the indexes of the lower tangent, the same way as find_top_tan.
+# On the lower chains the left hull walks from its rightmost point round to index 0, and the right
+# hull walks backwards from index 0 round to its rightmost point
+def find_bottom_tan(xs, ys, hull, left, right):
+    lo, n_left, i = left
+    mid, n_right, j_end = right
+    bound = ORIENTATION_ERROR_BOUND
+    j = 0
+    changed = True
+    while changed:
+        changed = False
+        b = hull[mid + j]
+        bx = xs[b]
+        by = ys[b]
+        # move clockwise on the left hull while the next point is on or below the tangent
+        while i != 0:
+            a = hull[lo + i]
+            ax = xs[a]
+            ay = ys[a]
+            c = hull[lo + i + 1] if i + 1 < n_left else hull[lo]
+            det_left = (bx - ax) * (ys[c] - ay)
+            det_right = (by - ay) * (xs[c] - ax)
+            det = det_left - det_right
+            err = bound * (det_left + det_right)
+            if not (det * det > err * err):
+                det = exact_orientation(xs, ys, a, b, c)
+            if det > 0:
+                break
+            i = i + 1 if i + 1 < n_left else 0
+            changed = True
+        a = hull[lo + i]
+        ax = xs[a]
+        ay = ys[a]
+        # move counter-clockwise on the right hull while the next point is on or below the tangent
+        while j != j_end:
+            b = hull[mid + j]
+            bx = xs[b]
+            by = ys[b]
+            c = hull[mid + j - 1] if j > 0 else hull[mid + n_right - 1]
+            det_left = (bx - ax) * (ys[c] - ay)
+            det_right = (by - ay) * (xs[c] - ax)
+            det = det_left - det_right
+            err = bound * (det_left + det_right)
+            if not (det * det > err * err):
+                det = exact_orientation(xs, ys, a, b, c)
+            if det > 0:
+                break
+            j = j - 1 if j > 0 else n_right - 1
+            changed = True
+    return i, j
+
+
+# time: O(nlogn) space: O(n). Hull of a sorted, duplicate free (n, 2) array, as positions in that array
+def hull_of_sorted(sorted_points):
+    if len(sorted_points) == 0:
+        return []
+    xs, ys, hull, leaves = leaf_hulls(sorted_points)
+    lo, size, end = convex_hull_solver(xs, ys, hull, leaves)
+    del hull[size:]
+    return hull
+
+
+# time: O(nlogn) space: O(n). Takes an (n, 2) array and returns the row indices of the hull vertices
+# in clockwise order, starting from the leftmost point. With cull set, the points inside the
+# Akl-Toussaint octagon are dropped before the sort
+def hull_indices(points, cull=True):
+    points = np.asarray(points, dtype=np.float64)
+    if cull and len(points):
+        keep = np.flatnonzero(octagon_cull(points))
+        order = keep[sort_order(points[keep])]
+    else:
+        order = sort_order(points)
+    return order[hull_of_sorted(points[order])]
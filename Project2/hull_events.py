@@ -0,0 +1,55 @@
+import numpy as np
+
+# The divide and conquer from hull_engine, one merge at a time, as a stream of events something can
+# draw. Nothing here touches Qt or waits on anyone: the events only carry coordinate arrays, so
+# recording them costs a constant factor on top of the merges themselves. The events are
+#   ('leaves', [(key, hull), ...])    the leaf hulls the merges start from
+#   ('tangents', left, right, lines)  the upper and lower tangents between two hulls about to merge,
+#                                     as a (2, 2, 2) array of line end points
+#   ('merge', left, right, hull)      left and right have been merged into one hull, kept as left
+#   ('done', rows)                    the rows of the final hull, clockwise from the leftmost point
+# where each hull is a (k, 2) array of its vertices clockwise from the leftmost, and keys (left and
+# right) name a hull until it gets merged away
+from hull_engine import *
+
+
+# time: O(n) space: O(n). The events for one merge of two (lo, size, end) hulls. Returns the merged
+# hull's triple once they have all been yielded
+def merge_events(sorted_points, xs, ys, hull, left, right):
+    top_left, top_right = find_top_tan(xs, ys, hull, left, right)
+    bottom_left, bottom_right = find_bottom_tan(xs, ys, hull, left, right)
+    ends = [[hull[left[0] + top_left], hull[right[0] + top_right]],
+            [hull[left[0] + bottom_left], hull[right[0] + bottom_right]]]
+    yield 'tangents', left[0], right[0], sorted_points[ends]
+    merged = merge_hull(xs, ys, hull, left, right)
+    lo, size, end = merged
+    yield 'merge', left[0], right[0], sorted_points[hull[lo:lo + size]]
+    return merged
+
+
+# time: O(nlogn) space: O(n). Yields the events of finding the hull of an (n, 2) array, in the order
+# convex_hull_solver does the merges
+def hull_events(points):
+    points = np.asarray(points, dtype=np.float64)
+    order = sort_order(points)
+    if not len(order):
+        yield 'leaves', []
+        yield 'done', order
+        return
+    sorted_points = points[order]
+    xs, ys, hull, leaves = leaf_hulls(sorted_points)
+    yield 'leaves', [(lo, sorted_points[hull[lo:lo + size]]) for lo, size, end in leaves]
+
+    stack = []
+    for leaf in leaves:
+        count = 1
+        while stack and stack[-1][1] == count:
+            left, left_count = stack.pop()
+            leaf = yield from merge_events(sorted_points, xs, ys, hull, left, leaf)
+            count += left_count
+        stack.append((leaf, count))
+    merged = stack.pop()[0]
+    while stack:
+        merged = yield from merge_events(sorted_points, xs, ys, hull, stack.pop()[0], merged)
+    lo, size, end = merged
+    yield 'done', order[hull[lo:lo + size]]
@@ -0,0 +1,114 @@
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from hull_engine import *
+
+# Below this many points the pool costs more than it saves, so the hull is found in this process
+PARALLEL_MIN_POINTS = 2 ** 18
+
+# Slabs per worker. A few more slabs than workers keeps everyone busy when the slabs come out uneven
+SLABS_PER_WORKER = 2
+
+# Points sampled to find the x values the slabs are cut at
+SPLIT_SAMPLE_SIZE = 2 ** 16
+
+# Runs inside a worker. Finds the hull of the points with lo_x <= x < hi_x, straight out of the
+# parent's shared (n, 2) float64 block. Returns the rows of its vertices (clockwise from the
+# leftmost) and the index of the rightmost one, or None if the slab is empty
+def slab_hull(name, n, lo_x, hi_x):
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        shared = np.ndarray((n, 2), dtype=np.float64, buffer=block.buf)
+        rows = np.flatnonzero((shared[:, 0] >= lo_x) & (shared[:, 0] < hi_x))
+        slab = shared[rows]
+        # the block can't be closed while an array still points into it
+        del shared
+    finally:
+        block.close()
+    if not len(rows):
+        return None
+    hull = hull_indices(slab)
+    end = np.lexsort((slab[hull, 1], slab[hull, 0]))[-1]
+    return rows[hull].tolist(), int(end)
+
+
+# time: O(s logs) space: O(s) for a sample of s points. x values that cut the points into about
+# equal slabs. Every slab starts at one cut and ends just before the next, so points with the same
+# x always land in the same slab and the slabs never overlap
+def slab_cuts(points, slabs):
+    n = len(points)
+    sample = points[np.random.default_rng().choice(n, min(n, SPLIT_SAMPLE_SIZE), replace=False), 0]
+    cuts = np.unique(np.quantile(sample, np.arange(1, slabs) / slabs))
+    return [-np.inf] + cuts.tolist() + [np.inf]
+
+
+# time: O(h) space: O(h) for h vertices across the slab hulls. Merges the slab hulls, left to right,
+# with the same stack of merge_hull calls as the single process engine. Only the hull vertices are
+# turned into Python lists, not the whole input
+def merge_slab_hulls(points, slab_results):
+    rows = []
+    leaves = []
+    for hull, end in slab_results:
+        leaves.append((len(rows), len(hull), end))
+        rows += hull
+    rows = np.array(rows)
+    xs = points[rows, 0].tolist()
+    ys = points[rows, 1].tolist()
+    buffer = list(range(len(rows)))
+    lo, size, end = convex_hull_solver(xs, ys, buffer, leaves)
+    return rows[buffer[lo:lo + size]]
+
+
+# Finds hulls with a pool of worker processes. The points go into one shared memory block, each
+# worker takes a vertical slab of it and finds that slab's hull, and this process merges the slab
+# hulls. Nothing bigger than a slab hull gets pickled. Keep one around to avoid paying the process
+# start up cost on every hull
+class ParallelHull:
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        if self.workers > 1:
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # time: O(nlogn / workers) for the slabs plus O(n) in this process, space: O(n).
+    # Same answer as hull_engine.hull_indices: the rows of the hull vertices, clockwise from the
+    # leftmost point
+    def hull_indices(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        n = len(points)
+        if self.pool is None or n < PARALLEL_MIN_POINTS:
+            return hull_indices(points)
+
+        block = shared_memory.SharedMemory(create=True, size=points.nbytes)
+        try:
+            shared = np.ndarray(points.shape, dtype=np.float64, buffer=block.buf)
+            shared[:] = points
+            cuts = slab_cuts(points, self.workers * SLABS_PER_WORKER)
+            futures = [self.pool.submit(slab_hull, block.name, n, cuts[i], cuts[i + 1])
+                       for i in range(len(cuts) - 1)]
+            slab_results = [result for result in (future.result() for future in futures) if result is not None]
+        finally:
+            block.close()
+            block.unlink()
+        return merge_slab_hulls(points, slab_results)
+
+
+# Hull of points using a temporary pool
+def parallel_hull_indices(points, workers=None):
+    with ParallelHull(workers) as solver:
+        return solver.hull_indices(points)
@@ -0,0 +1,64 @@
+import numpy as np
+
+# Random point sets for the hull, made in NumPy batches. These are the same distributions the GUI
+# has always drawn one point at a time, come back as (n, 2) float64 arrays the engine takes as is,
+# and give the same points every time for the same seed
+
+# Every distribution only keeps points within this distance of the origin
+MAX_RADIUS = 0.98
+
+# Standard deviation of both coordinates of the gaussian distribution
+GAUSSIAN_SIGMA = 0.25
+
+# Fewest points drawn per batch, so topping up the last few missing points doesn't take many rounds
+MIN_BATCH = 1024
+
+
+# Points uniform in the square [-1, 1]^2 that land in the disc
+def uniform_batch(rng, size):
+    points = rng.uniform(-1.0, 1.0, (size, 2))
+    return points[(points ** 2).sum(axis=1) <= MAX_RADIUS ** 2]
+
+
+# Points uniform in the cube [-1, 1]^3 that land in the ball, with all three coordinates
+def sphere_batch(rng, size):
+    points = rng.uniform(-1.0, 1.0, (size, 3))
+    return points[(points ** 2).sum(axis=1) <= MAX_RADIUS ** 2]
+
+
+# Normal points in both coordinates that land in the disc
+def gaussian_batch(rng, size):
+    points = rng.normal(0.0, GAUSSIAN_SIGMA, (size, 2))
+    return points[(points ** 2).sum(axis=1) <= MAX_RADIUS ** 2]
+
+
+# name: (batch maker, about what fraction of the points drawn it keeps)
+DISTRIBUTIONS = {
+    'uniform': (uniform_batch, np.pi * MAX_RADIUS ** 2 / 4),
+    'sphere': (sphere_batch, np.pi * MAX_RADIUS ** 3 / 6),
+    'gaussian': (gaussian_batch, 0.99),
+}
+
+
+# time: O(nlogn) space: O(n). n points from the named distribution, no two with the same x. Batches
+# are drawn until there are enough, with the points whose x was already taken dropped by sorting on
+# x (the first one drawn stays), and the points keep the order they were drawn in. The same seed
+# always gives the same points, and seed=None draws fresh ones. Sphere points have three columns
+def sample_points(n, distribution='uniform', seed=None):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError('unknown point distribution: {}'.format(distribution))
+    batch, kept_fraction = DISTRIBUTIONS[distribution]
+    rng = np.random.default_rng(seed)
+    points = batch(rng, 0)
+    while len(points) < n:
+        size = max(MIN_BATCH, int((n - len(points)) / kept_fraction * 1.05))
+        points = np.vstack((points, batch(rng, size)))
+        xs, first = np.unique(points[:, 0], return_index=True)
+        points = points[np.sort(first)]
+    return points[:n]
+
+
+# time: O(nlogn) space: O(n). n points for the hull, as an (n, 2) array. Sphere points are projected
+# onto the x-y plane, so only x and y are left
+def generate_points(n, distribution='uniform', seed=None):
+    return np.ascontiguousarray(sample_points(n, distribution, seed)[:, :2])
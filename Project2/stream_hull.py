@@ -0,0 +1,76 @@
+import itertools
+import os
+
+import numpy as np
+
+from hull_engine import *
+
+# Points read per chunk. At 16 bytes a point this is 64 MB of coordinates in flight
+CHUNK_POINTS = 2 ** 22
+
+
+# Yields (n, 2) float64 chunks of a raw binary file of x, y pairs. The file is memory mapped, so only
+# the chunk being worked on is ever paged in. Each chunk is copied out so the map can be dropped
+def binary_chunks(path, chunk_points=CHUNK_POINTS):
+    # numpy can't map an empty file
+    if os.path.getsize(path) == 0:
+        return
+    points = np.memmap(path, dtype=np.float64, mode='r')
+    if len(points) % 2:
+        raise ValueError('{} does not hold a whole number of x, y pairs'.format(path))
+    points = points.reshape(-1, 2)
+    for lo in range(0, len(points), chunk_points):
+        yield np.array(points[lo:lo + chunk_points])
+
+
+# Yields (n, 2) float64 chunks of a text file with one x, y pair per line, split by delimiter
+# (whitespace if None). header is the number of lines to skip at the top
+def csv_chunks(path, chunk_points=CHUNK_POINTS, delimiter=',', header=0):
+    with open(path) as f:
+        for _ in range(header):
+            next(f, None)
+        while True:
+            lines = list(itertools.islice(f, chunk_points))
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=delimiter, dtype=np.float64, ndmin=2)[:, :2]
+
+
+# Picks the reader by extension: .csv and .txt files are text, anything else raw float64 pairs
+def point_chunks(path, chunk_points=CHUNK_POINTS, **csv_options):
+    if str(path).lower().endswith(('.csv', '.txt')):
+        return csv_chunks(path, chunk_points, **csv_options)
+    return binary_chunks(path, chunk_points)
+
+
+# Keeps the hull of every point added so far without keeping the points. Each chunk's hull is found
+# with the engine, then merged with the running hull by taking the hull of both vertex sets, so
+# memory stays at one chunk plus two hulls
+class StreamingHull:
+
+    def __init__(self):
+        # hull vertices clockwise from the leftmost, and where each one came from in the stream
+        self.points = np.empty((0, 2), dtype=np.float64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.count = 0
+
+    # time: O(mlogm + hlogh) for a chunk of m points and a hull of h, space: O(m + h)
+    def add(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        chunk_hull = hull_indices(chunk)
+        points = np.vstack((self.points, chunk[chunk_hull]))
+        rows = np.concatenate((self.rows, chunk_hull + self.count))
+        merged = hull_indices(points, cull=False)
+        self.points = points[merged]
+        self.rows = rows[merged]
+        self.count += len(chunk)
+
+
+# time: O(nlogm) for n points read m at a time, space: O(m + h).
+# Hull of every point in the file at path. Returns the hull's coordinates and the stream position
+# (row in the file) of each vertex
+def stream_hull(path, chunk_points=CHUNK_POINTS, **csv_options):
+    running = StreamingHull()
+    for chunk in point_chunks(path, chunk_points, **csv_options):
+        running.add(chunk)
+    return running.points, running.rows
@@ -7,11 +7,22 @@ import math
 
 class NetworkRoutingSolver:
     def __init__(self):
-        pass
+        self.network = None
 
+    # Takes a CS312Graph or a CS312CSRGraph. Dijkstra always runs on the CSR form, so a CS312Graph
+    # gets converted here, once per graph, and not inside the timed part. The relaxation loops read
+    # the arrays through memoryviews, which hand back plain Python numbers without copying anything
+    # (indexing the NumPy arrays one element at a time would make a NumPy scalar per read)
     def initializeNetwork(self, network):
-        assert (type(network) == CS312Graph)
+        assert (type(network) == CS312Graph or type(network) == CS312CSRGraph)
+        if network is self.network:
+            return
         self.network = network
+        if type(network) == CS312Graph:
+            self.graph = CS312CSRGraph.fromGraph(network)
+        else:
+            self.graph = network
+        self.adjacency = (memoryview(self.graph.offsets), memoryview(self.graph.targets), memoryview(self.graph.weights))
 
     def getShortestPath(self, destIndex):
         self.dest = destIndex
@@ -23,11 +34,9 @@ class NetworkRoutingSolver:
         path_edges = []
         total_length = 0
 
-        sourceNode = self.network.nodes[self.source]
-        sourceID = sourceNode.node_id
-        destNode = self.network.nodes[destIndex]
-        currentID = destNode.node_id
-        nodes = self.network.nodes
+        sourceID = self.source
+        currentID = destIndex
+        locs = self.graph.locs
 
         if self.prev[currentID] == -math.inf:
             return {'cost': total_length, 'path': []}
@@ -37,7 +46,7 @@ class NetworkRoutingSolver:
             if prevID is None:
                 return {'cost': total_length, 'path': []}
             nodeDist = self.dist[currentID]
-            path_edges.append((nodes[currentID].loc, nodes[prevID].loc, '{:.0f}'.format(nodeDist)))
+            path_edges.append((locs[currentID], locs[prevID], '{:.0f}'.format(nodeDist)))
             total_length += nodeDist
             currentID = prevID
 
@@ -49,12 +58,10 @@ class NetworkRoutingSolver:
         # TODO: RUN DIJKSTRA'S TO DETERMINE SHORTEST PATHS.
         #       ALSO, STORE THE RESULTS FOR THE SUBSEQUENT
         #       CALL TO getShortestPath(dest_index)
-        nodes = self.network.nodes
-
         if not use_heap:
-            dist, prev = self.computePathsArray(srcIndex, nodes, destIndex)
+            dist, prev = self.computePathsArray(srcIndex, self.adjacency, destIndex)
         else:
-            dist, prev = self.computePathsHeap(srcIndex, nodes, destIndex)
+            dist, prev = self.computePathsHeap(srcIndex, self.adjacency, destIndex)
 
         self.dist = dist
         self.prev = prev
@@ -65,27 +72,29 @@ class NetworkRoutingSolver:
     # decreaseKeyHeap() |E| times worst case. Both of these functions are O(log|V|)
 
     # Space complexity: O(|V|) would be O(4|V|) but simplifies
-    def computePathsHeap(self, srcIndex, nodes, destIndex):
+    def computePathsHeap(self, srcIndex, graph, destIndex):
+        offsets, targets, weights = graph
+        size = len(offsets) - 1
         # create dist and previous arrays
-        dist = [math.inf] * len(nodes)
-        prev = [-math.inf] * len(nodes)
+        dist = [math.inf] * size
+        prev = [-math.inf] * size
         dist[srcIndex] = 0
-        singleDist = [math.inf] * len(nodes)
-        self.heapCount = len(nodes) - 1
-        self.heap, self.pointer = self.makeHeap(nodes, srcIndex)
+        singleDist = [math.inf] * size
+        self.heapCount = size - 1
+        self.heap, self.pointer = self.makeHeap(size, srcIndex)
         # start while loop- run until there are no nodes left
         while self.heapCount > 0:
             index, weight = self.deleteMinHeap()
             # if index == destIndex:
             #     break
                 # explore current nodes neighbors
-            for edge in nodes[index].neighbors:
-                currIndex = edge.dest.node_id
-                currWeight = weight + edge.length
+            for k in range(offsets[index], offsets[index + 1]):
+                currIndex = targets[k]
+                currWeight = weight + weights[k]
                 # if current distance in dist[] array is larger- we have found a shorter path
                 if dist[currIndex] > currWeight:
                     dist[currIndex] = currWeight
-                    singleDist[currIndex] = edge.length
+                    singleDist[currIndex] = weights[k]
                     prev[currIndex] = index
                     # call decrease key
                     self.decreaseKeyHeap(currIndex, currWeight)
@@ -93,18 +102,18 @@ class NetworkRoutingSolver:
 
     # Time complexity: O(|V|)- loop over array of size |V| once to create heap
     # Space complexity: O(|V|)- creating heep and pointer arrays which are of size |V|
-    def makeHeap(self, nodes, srcIndex):
-        pointer = [-1] * len(nodes)
-        heap = [] * len(nodes)
+    def makeHeap(self, size, srcIndex):
+        pointer = [-1] * size
+        heap = [] * size
         # set pointer and heap for the source node
         pointer[srcIndex] = 0
         heap.append((srcIndex, 0))
         counter = 1
-        for node in nodes:
+        for node_id in range(size):
             # append all nodes except for the source node
-            if node.node_id != srcIndex:
-                heap.append((node.node_id, math.inf))
-                pointer[node.node_id] = counter
+            if node_id != srcIndex:
+                heap.append((node_id, math.inf))
+                pointer[node_id] = counter
                 counter += 1
         return heap, pointer
 
@@ -221,16 +230,18 @@ class NetworkRoutingSolver:
 
     # Time complexity: O(|V^2|)
     # Space complexity: O(|V|) simplifies from O(4|V|)
-    def computePathsArray(self, srcIndex, nodes, destIndex):
+    def computePathsArray(self, srcIndex, graph, destIndex):
+        offsets, targets, weights = graph
+        size = len(offsets) - 1
         # Initialize array to keep track of distances
-        dist = [math.inf] * len(nodes)
-        singleDist = [math.inf] * len(nodes)
+        dist = [math.inf] * size
+        singleDist = [math.inf] * size
         singleDist[srcIndex] = 0
         dist[srcIndex] = 0
-        self.pq_size = len(nodes)
+        self.pq_size = size
         # initialize priority queue to be empty
         pq = []
-        prev = [-math.inf] * len(nodes)
+        prev = [-math.inf] * size
         pq.append((srcIndex, 0))
         # run while loop until size of our priority queue is zero
         while self.pq_size > 0:
@@ -241,12 +252,12 @@ class NetworkRoutingSolver:
             # set distance of current node in our priority queue to -1 so we don't use it again
             pq[pq_index] = (index, -1)
             # visit neighbors of current node
-            for edge in nodes[index].neighbors:
-                curr_index = edge.dest.node_id
-                curr_weight = edge.length + weight
+            for k in range(offsets[index], offsets[index + 1]):
+                curr_index = targets[k]
+                curr_weight = weights[k] + weight
                 # if node hasn't been visited or we found shorter path update distance array
                 if (dist[curr_index] == math.inf) or (dist[curr_index] > curr_weight):
-                    singleDist[curr_index] = edge.length
+                    singleDist[curr_index] = weights[k]
                     # this is essentially the decrease key for the array implementation
                     pq.append((curr_index, curr_weight))
                     dist[curr_index] = curr_weight